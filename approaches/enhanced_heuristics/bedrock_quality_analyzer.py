@@ -1,14 +1,98 @@
 #!/usr/bin/env python3
+import io
 import json
-import subprocess
+import hashlib
 import re
+import sqlite3
+import textwrap
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+import boto3
+from botocore.config import Config
+
+# Shared by every analyzer (and thread) in the process: pooled keep-alive
+# connections, with adaptive retries to ride out Bedrock throttling
+_bedrock = boto3.client('bedrock-runtime', region_name='us-east-1', config=Config(
+    max_pool_connections=16,
+    retries={'max_attempts': 5, 'mode': 'adaptive'},
+    read_timeout=60
+))
+
+# Response cache: the same indexed kv table latex_to_xml.py keeps, opened once
+# per process and shared by the analyzer threads under a lock
+_cache_db = None
+_cache_lock = threading.Lock()
+
+def _get_cache_db():
+    global _cache_db
+    if _cache_db is None:
+        cache_path = Path("output") / "bedrock_cache.db"
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        _cache_db = sqlite3.connect(str(cache_path), check_same_thread=False)
+        _cache_db.execute('CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT)')
+    return _cache_db
+
+# Shared by the single-sample and batched prompts
+_PROMPT_PREAMBLE = """You are analyzing text from a PDF-to-ePub conversion to detect FORMATTING DEFECTS.
+
+EXAMPLES of formatting issues to detect:
+- Missing text: "We conducted experiments to validate our" (sentence cuts off)
+- Footer intrusion: "The results show https://example.com/paper significant improvement" (URL inserted mid-paragraph)
+- Broken citations: "As shown by Smith et al. the method works" (missing closing bracket)
+- Word fragmentation: "The res ults show signif icant improve ment" (words split incorrectly)
+- Repeated headers: "Introduction Introduction The main topic is..." (duplicate titles)
+
+IGNORE content quality - only flag technical formatting defects.
+"""
+_RESPONSE_FIELDS = '''  "has_missing_text": true/false,
+  "has_footer_intrusion": true/false,
+  "has_broken_citations": true/false,
+  "has_word_fragmentation": true/false,
+  "formatting_issues": ["specific issues found"],
+  "overall_score": 1-10,
+  "severity": "LOW|MEDIUM|HIGH"'''
+
+def _pick_main_html(sizes):
+    """Name of the HTML document to sample, from {name: size} in archive order"""
+    # Find the main HTML content file
+    name = next((filename for filename in ['index.html', 'content.html', 'text.html']
+                 if filename in sizes), None)
+    
+    if not name or not sizes[name]:
+        # Try to find any HTML file
+        html_files = [f for f in sizes if f.endswith('.html') or f.endswith('.xhtml')]
+        if html_files:
+            name = html_files[0]
+    
+    return name if name and sizes[name] else None
+
+def _parse_html(stream):
+    """Parse HTML with libxml2; a parser per call because analyses may run on several threads"""
+    return lxml_html.parse(stream, parser=lxml_html.HTMLParser(encoding='utf-8')).getroot()
+
+def _truncate_sample(text):
+    """Truncate if too long (cost control)"""
+    if len(text) > 2000:
+        text = text[:2000] + "..."
+    return text
+
+# Response flag -> issue_counts key, in report order
+_ISSUE_FLAGS = {
+    "has_missing_text": "missing_text",
+    "has_footer_intrusion": "footer_intrusion",
+    "has_broken_citations": "broken_citations",
+    "has_word_fragmentation": "word_fragmentation"
+}
 
 class BedrockQualityAnalyzer:
-    def __init__(self, epub_path):
+    def __init__(self, epub_path, assets=None):
         self.epub_path = Path(epub_path)
+        # Optional pre-read {'html_files': {name: bytes}, 'toc': bytes} (see load_epub_assets)
+        self.assets = assets
         
     def analyze_with_bedrock(self):
         """Use Bedrock to analyze ePub quality"""
@@ -19,50 +103,98 @@ class BedrockQualityAnalyzer:
         if not text_samples:
             return {"error": "Could not extract text samples"}
         
-        # Analyze each sample
+        # Analyze each sample; the calls are network-bound, so run them concurrently
+        tasks = {section: text for section, text in text_samples.items()
+                 if len(text.strip()) > 50}  # Only analyze substantial content
         results = {}
-        for section, text in text_samples.items():
-            if len(text.strip()) > 50:  # Only analyze substantial content
-                analysis = self._analyze_text_with_bedrock(text, section)
-                results[section] = analysis
+        if tasks:
+            with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+                futures = {section: executor.submit(self._analyze_text_with_bedrock, text, section)
+                           for section, text in tasks.items()}
+                # Collected in sample order so section_details reads beginning -> end
+                results = {section: future.result() for section, future in futures.items()}
         
         return self._summarize_bedrock_results(results)
     
+    @classmethod
+    def analyze_many(cls, epub_paths, max_batch_chars=6000, max_batch_samples=8):
+        """Analyze several ePubs, packing their samples into shared multi-sample prompts
+        
+        Returns {epub_path: summary} in input order.
+        """
+        analyzers = [cls(epub_path) for epub_path in epub_paths]
+        
+        summaries = {}
+        samples = []  # (analyzer, section, text)
+        for analyzer in analyzers:
+            print(f"🤖 Running Bedrock quality analysis on {analyzer.epub_path.name}")
+            text_samples = analyzer._extract_text_samples()
+            if not text_samples:
+                summaries[analyzer.epub_path] = {"error": "Could not extract text samples"}
+                continue
+            for section, text in text_samples.items():
+                if len(text.strip()) > 50:  # Only analyze substantial content
+                    samples.append((analyzer, section, _truncate_sample(text)))
+        
+        # Fill each prompt up to the size/count limits before starting the next
+        batches = []
+        batch, batch_chars = [], 0
+        for sample in samples:
+            if batch and (batch_chars + len(sample[2]) > max_batch_chars or len(batch) == max_batch_samples):
+                batches.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(sample)
+            batch_chars += len(sample[2])
+        if batch:
+            batches.append(batch)
+        
+        results = {analyzer.epub_path: {} for analyzer in analyzers}
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for batch, verdicts in zip(batches, executor.map(cls._analyze_batch_with_bedrock, batches)):
+                for (analyzer, section, _), verdict in zip(batch, verdicts):
+                    results[analyzer.epub_path][section] = verdict
+        
+        return {
+            analyzer.epub_path: summaries.get(analyzer.epub_path)
+            or analyzer._summarize_bedrock_results(results[analyzer.epub_path])
+            for analyzer in analyzers
+        }
+    
     def _extract_text_samples(self):
         """Extract text samples from key sections of the ePub"""
         try:
-            with zipfile.ZipFile(self.epub_path, 'r') as epub:
-                # Find the main HTML content file
-                html_content = None
-                for filename in ['index.html', 'content.html', 'text.html']:
-                    try:
-                        html_content = epub.read(filename).decode('utf-8')
-                        break
-                    except KeyError:
-                        continue
-                
-                if not html_content:
-                    # Try to find any HTML file
-                    html_files = [f for f in epub.namelist() if f.endswith('.html') or f.endswith('.xhtml')]
-                    if html_files:
-                        html_content = epub.read(html_files[0]).decode('utf-8')
-                
-                if not html_content:
+            if self.assets is not None:
+                # Already decompressed by the caller
+                html_files = self.assets['html_files']
+                html_name = _pick_main_html({name: len(data) for name, data in html_files.items()})
+                if not html_name:
                     return {}
-                
-            # Parse HTML and extract clean text
-            soup = BeautifulSoup(html_content, 'html.parser')
-            paragraphs = [p.get_text().strip() for p in soup.find_all('p') if p.get_text().strip()]
+                root = _parse_html(io.BytesIO(html_files[html_name]))
+            else:
+                with zipfile.ZipFile(self.epub_path, 'r') as epub:
+                    html_name = _pick_main_html({info.filename: info.file_size for info in epub.infolist()})
+                    if not html_name:
+                        return {}
+                    # Parse straight from the decompressing stream
+                    with epub.open(html_name) as stream:
+                        root = _parse_html(stream)
+            
+            if root is None:
+                return {}
+            paragraphs = [text for text in (p.text_content().strip() for p in root.iter('p')) if text]
             
             if len(paragraphs) < 3:
                 return {}
             
-            # Sample key sections
+            # Sample key sections: bounds computed once, joined straight from islice
             total_paras = len(paragraphs)
+            third = total_paras // 3
+            end_count = min(3, total_paras // 4)
+            end_start = total_paras - end_count if end_count else 0  # short documents end with everything
             samples = {
-                "beginning": " ".join(paragraphs[:min(5, total_paras//3)]),
-                "middle": " ".join(paragraphs[total_paras//3:2*total_paras//3][:5]),
-                "end": " ".join(paragraphs[-min(3, total_paras//4):])
+                "beginning": " ".join(islice(paragraphs, min(5, third))),
+                "middle": " ".join(islice(paragraphs, third, min(third + 5, 2 * total_paras // 3))),
+                "end": " ".join(islice(paragraphs, end_start, total_paras))
             }
             
             return samples
@@ -73,83 +205,122 @@ class BedrockQualityAnalyzer:
     
     def _analyze_text_with_bedrock(self, text, section):
         """Analyze text quality using Bedrock"""
-        # Truncate if too long (cost control)
-        if len(text) > 2000:
-            text = text[:2000] + "..."
-        
-        prompt = f"""You are analyzing text from a PDF-to-ePub conversion to detect FORMATTING DEFECTS.
-
-EXAMPLES of formatting issues to detect:
-- Missing text: "We conducted experiments to validate our" (sentence cuts off)
-- Footer intrusion: "The results show https://example.com/paper significant improvement" (URL inserted mid-paragraph)
-- Broken citations: "As shown by Smith et al. the method works" (missing closing bracket)
-- Word fragmentation: "The res ults show signif icant improve ment" (words split incorrectly)
-- Repeated headers: "Introduction Introduction The main topic is..." (duplicate titles)
-
-IGNORE content quality - only flag technical formatting defects.
-
+        prompt = f"""{_PROMPT_PREAMBLE}
 Text from {section} section:
-{text}
+{_truncate_sample(text)}
 
 Respond with JSON:
 {{
-  "has_missing_text": true/false,
-  "has_footer_intrusion": true/false,
-  "has_broken_citations": true/false,
-  "has_word_fragmentation": true/false,
-  "formatting_issues": ["specific issues found"],
-  "overall_score": 1-10,
-  "severity": "LOW|MEDIUM|HIGH"
+{_RESPONSE_FIELDS}
 }}"""
 
         try:
-            body = {
-                "messages": [{
-                    "role": "user", 
-                    "content": [{"text": prompt}]
-                }],
-                "inferenceConfig": {
-                    "maxTokens": 250,
-                    "temperature": 0.1
-                }
-            }
-            
-            body_json = json.dumps(body)
-            body_b64 = subprocess.check_output(['base64', '-w', '0'], input=body_json.encode()).decode()
-            
-            cmd = f"""
-            bash -c 'source ~/workspace/.secure-agent/bin/aws-creds && 
-            ~/workspace/.secure-agent/tools/aws-v2-bin/aws bedrock-runtime invoke-model \
-                --model-id amazon.nova-micro-v1:0 \
-                --region us-east-1 \
-                --body "{body_b64}" \
-                /tmp/bedrock_quality_response.json'
-            """
-            
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                with open('/tmp/bedrock_quality_response.json', 'r') as f:
-                    response = json.load(f)
-                    response_text = response['output']['message']['content'][0]['text'].strip()
-                    
-                    # Handle markdown code blocks
-                    if "```json" in response_text:
-                        json_start = response_text.find("```json") + 7
-                        json_end = response_text.find("```", json_start)
-                        if json_end > json_start:
-                            response_text = response_text[json_start:json_end].strip()
-                    
-                    try:
-                        return json.loads(response_text)
-                    except json.JSONDecodeError:
-                        return {"raw_response": response_text, "error": "Could not parse JSON"}
-            else:
-                return {"error": f"Bedrock call failed: {result.stderr}"}
-                
+            return self._invoke_bedrock(prompt, max_tokens=250)
         except Exception as e:
             return {"error": f"Analysis error: {e}"}
     
+    @staticmethod
+    def _analyze_batch_with_bedrock(batch):
+        """Analyze (analyzer, section, text) samples from several ePubs with one Bedrock call"""
+        if len(batch) == 1:
+            analyzer, section, text = batch[0]
+            return [analyzer._analyze_text_with_bedrock(text, section)]
+        
+        parts = [_PROMPT_PREAMBLE, f"\nAnalyze each of the following {len(batch)} samples independently.\n"]
+        for number, (analyzer, section, text) in enumerate(batch):
+            parts.append(f"\n--- SAMPLE {number} ({analyzer.epub_path.name}, {section} section) ---\n{text}\n")
+        parts.append(f"""
+Respond with a JSON array holding one object per sample, in sample order:
+[
+  {{
+    "sample": <sample number>,
+{textwrap.indent(_RESPONSE_FIELDS, '  ')}
+  }}
+]""")
+        
+        try:
+            answer = BedrockQualityAnalyzer._invoke_bedrock(''.join(parts), max_tokens=250 * len(batch))
+        except Exception as e:
+            answer = {"error": f"Analysis error: {e}"}
+        if not isinstance(answer, list):
+            # A bare number, string or null from the model is not a verdict either
+            if isinstance(answer, dict) and "error" in answer:
+                error = answer
+            else:
+                error = {"error": "Expected a JSON array of verdicts"}
+            return [error] * len(batch)
+        
+        # Re-dispatch verdicts by their sample number
+        verdicts = [{"error": "No verdict returned for sample"} for _ in batch]
+        for verdict in answer:
+            number = verdict.get("sample") if isinstance(verdict, dict) else None
+            if isinstance(number, int) and 0 <= number < len(batch):
+                verdicts[number] = verdict
+        return verdicts
+    
+    @staticmethod
+    def _invoke_bedrock(prompt, max_tokens):
+        """Send one prompt to Nova Micro and return its parsed JSON answer"""
+        body = {
+            "messages": [{
+                "role": "user", 
+                "content": [{"text": prompt}]
+            }],
+            "inferenceConfig": {
+                "maxTokens": max_tokens,
+                "temperature": 0.1
+            }
+        }
+        
+        model_id = 'amazon.nova-micro-v1:0'
+        body_json = json.dumps(body)
+        
+        # Identical requests (re-runs, shared boilerplate) are answered from disk
+        cache_key = hashlib.blake2b(f"{model_id}:{body_json}".encode(), digest_size=16).hexdigest()
+        try:
+            with _cache_lock:
+                row = _get_cache_db().execute('SELECT value FROM kv WHERE key = ?', (cache_key,)).fetchone()
+            if row:
+                return json.loads(row[0])
+        except Exception:
+            pass
+        
+        try:
+            response = _bedrock.invoke_model(
+                modelId=model_id,
+                body=body_json,
+                accept='application/json',
+                contentType='application/json'
+            )
+        except Exception as e:
+            return {"error": f"Bedrock call failed: {e}"}
+        
+        response_body = json.loads(response['body'].read())
+        response_text = response_body['output']['message']['content'][0]['text'].strip()
+        
+        # Handle markdown code blocks
+        if "```json" in response_text:
+            json_start = response_text.find("```json") + 7
+            json_end = response_text.find("```", json_start)
+            if json_end > json_start:
+                response_text = response_text[json_start:json_end].strip()
+        
+        try:
+            analysis = json.loads(response_text)
+        except json.JSONDecodeError:
+            return {"raw_response": response_text, "error": "Could not parse JSON"}
+        
+        # Cache only parsed answers so failures are retried next run
+        try:
+            with _cache_lock:
+                db = _get_cache_db()
+                with db:
+                    db.execute('INSERT OR REPLACE INTO kv VALUES (?, ?)', (cache_key, json.dumps(analysis)))
+        except Exception as e:
+            print(f"⚠️ Cache write failed: {e}")
+        
+        return analysis
+    
     def _summarize_bedrock_results(self, results):
         """Summarize Bedrock analysis results"""
         if not results:
@@ -159,14 +330,12 @@ Respond with JSON:
         all_issues = []
         severities = []
         scores = []
-        issue_counts = {
-            "missing_text": 0,
-            "footer_intrusion": 0, 
-            "broken_citations": 0,
-            "word_fragmentation": 0
-        }
+        issue_counts = dict.fromkeys(_ISSUE_FLAGS.values(), 0)
         
         for section, analysis in results.items():
+            # A bare JSON list or string from the model carries no verdict fields
+            if not isinstance(analysis, dict):
+                continue
             if "error" not in analysis:
                 if "formatting_issues" in analysis:
                     all_issues.extend(analysis["formatting_issues"])
@@ -178,8 +347,8 @@ Respond with JSON:
                     scores.append(analysis["overall_score"])
                 
                 # Count specific issue types
-                for issue_type in issue_counts:
-                    if f"has_{issue_type}" in analysis and analysis[f"has_{issue_type}"]:
+                for flag, issue_type in _ISSUE_FLAGS.items():
+                    if analysis.get(flag):
                         issue_counts[issue_type] += 1
         
         # Calculate overall metrics
@@ -211,10 +380,10 @@ def main():
     epub_dir = Path("epub_books")
     epub_files = list(epub_dir.glob("*.epub"))[:2]  # Test on first 2 files
     
-    for epub_file in epub_files:
-        analyzer = BedrockQualityAnalyzer(epub_file)
-        result = analyzer.analyze_with_bedrock()
-        
+    # Samples from all files share batched prompts, sent a few at a time
+    results = BedrockQualityAnalyzer.analyze_many(epub_files)
+    
+    for epub_file, result in results.items():
         print(f"\n=== Bedrock Formatting Analysis: {epub_file.name} ===")
         if "error" in result:
             print(f"Error: {result['error']}")
@@ -5,6 +5,9 @@ import re
 from pathlib import Path
 from datetime import datetime
 
+# One reference list entry; optional venue/link pieces are pre-rendered or ''
+_REF_TEMPLATE = '\n        <li id="{id}">{authors}. "{title}". {venue}{year}.{link}</li>'
+
 class JsonToEpubGenerator:
     def __init__(self):
         self.output_dir = Path("epub_books")
@@ -246,34 +249,27 @@ class JsonToEpubGenerator:
         if not references:
             return ''
         
-        refs_html = '\n<div class="references">'
-        refs_html += '\n    <h2 id="references">References</h2>'
-        refs_html += '\n    <ol class="reference-list">'
+        parts = ['\n<div class="references">'
+                 '\n    <h2 id="references">References</h2>'
+                 '\n    <ol class="reference-list">']
         
+        escape = self._escape_html
         for ref in references:
-            refs_html += f'\n        <li id="{ref["id"]}">'
-            
-            # Authors
-            authors = ', '.join(ref['authors'])
-            refs_html += f'{self._escape_html(authors)}. '
-            
-            # Title
-            refs_html += f'"{self._escape_html(ref["title"])}". '
-            
-            # Venue and year
-            if ref.get('venue'):
-                refs_html += f'{self._escape_html(ref["venue"])}, '
-            refs_html += f'{ref["year"]}.'
-            
-            # URL if available
-            if ref.get('url'):
-                refs_html += f' <a href="{ref["url"]}" target="_blank">Link</a>'
-            
-            refs_html += '</li>'
-        
-        refs_html += '\n    </ol>'
-        refs_html += '\n</div>'
-        return refs_html
+            # Optional pieces collapse to '' so every reference is one format_map
+            venue = ref.get('venue')
+            url = ref.get('url')
+            parts.append(_REF_TEMPLATE.format_map({
+                'id': ref['id'],
+                'authors': escape(', '.join(ref['authors'])),
+                'title': escape(ref['title']),
+                'venue': f'{escape(venue)}, ' if venue else '',
+                'year': ref['year'],
+                'link': f' <a href="{url}" target="_blank">Link</a>' if url else '',
+            }))
+        
+        parts.append('\n    </ol>'
+                     '\n</div>')
+        return ''.join(parts)
     
     def _generate_content_opf(self, data, filename):
         """Generate content.opf metadata file"""
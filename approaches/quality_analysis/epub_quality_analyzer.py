@@ -1,69 +1,118 @@
 #!/usr/bin/env python3
+import io
 import os
 import zipfile
 import re
 from pathlib import Path
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 import xml.etree.ElementTree as ET
 
+# Patterns compiled once at import instead of going through re's cache on every call
+_P_RE = re.compile(r'<p[^>]*>(.*?)</p>', re.DOTALL)
+_P_RE_ANY_CASE = re.compile(r'<p[^>]*>(.*?)</p>', re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+# <img> and <table> openings counted together in a single scan
+_IMG_OR_TABLE_RE = re.compile(r'<(img|table)[^>]*>')
+_PIPE_P_RE = re.compile(r'<p[^>]*>.*\|.*\|.*</p>')
+_BR_RUN_RE = re.compile(r'(<br[^>]*>\s*){3,}')
+# TOC labels that carry no meaning (bare numbers, back-links, fragments)
+_MEANINGLESS_TOC_RE = re.compile(r'^\d+$|^\.\d+$|^↩$|^analysis section\)$')
+# Common footer/header content, matched against lowercased paragraph text
+_FOOTER_RE = re.compile(
+    r'manuscript submitted to|arxiv:|page \d+ of \d+|©.*\d{4}|proceedings of'
+    r'|conference on|https?://[^\s]+|acm.*\d{4}|ieee.*\d{4}'
+)
+_TOC_MARKER_RES = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'table of contents',
+        r'contents',
+        r'outline',
+        r'<nav[^>]*>.*</nav>',
+        r'class=["\']toc["\']'
+    )
+]
+
+def load_epub_assets(epub_path):
+    """Read an ePub's HTML documents and NCX with a single ZipFile open
+    
+    The result can be passed as `assets` to EpubQualityAnalyzer and
+    BedrockQualityAnalyzer so a file analyzed by both is decompressed once.
+    """
+    with zipfile.ZipFile(epub_path, 'r') as epub:
+        html_files = {name: epub.read(name) for name in epub.namelist()
+                      if name.endswith('.html') or name.endswith('.xhtml')}
+        toc = epub.read('toc.ncx') if 'toc.ncx' in epub.NameToInfo else None
+    return {'html_files': html_files, 'toc': toc}
+
+def assets_from_members(members):
+    """Build analyzer assets from ePub members already read into a {name: bytes} dict"""
+    html_files = {name: data for name, data in members.items()
+                  if name.endswith('.html') or name.endswith('.xhtml')}
+    return {'html_files': html_files, 'toc': members.get('toc.ncx')}
+
 class EpubQualityAnalyzer:
-    def __init__(self, epub_path):
+    def __init__(self, epub_path, assets=None):
         self.epub_path = Path(epub_path)
+        self.assets = assets
         self.issues = []
         
     def analyze(self):
         """Analyze ePub file for quality issues"""
         print(f"\n=== Analyzing: {self.epub_path.name} ===")
         
-        with zipfile.ZipFile(self.epub_path, 'r') as epub:
-            # Extract content
-            content_html = self._get_main_content(epub)
-            toc_content = self._get_toc_content(epub)
-            
-            # Run quality checks
-            self._check_toc_issues(toc_content, content_html)
-            self._check_repeated_footers(content_html)
-            self._check_table_formatting(content_html)
-            self._check_general_formatting(content_html)
-            self._check_blank_pages(epub)
-            self._check_toc_placement(content_html)
-            self._check_excessive_line_breaks(content_html)
-            
+        # Extract content
+        assets = self.assets if self.assets is not None else load_epub_assets(self.epub_path)
+        html_files = assets['html_files']
+        content_html = self._get_main_content(html_files)
+        toc_content = self._get_toc_content(assets['toc'])
+        
+        # Paragraph bodies are shared by several checks: scan for them once
+        paragraphs = _P_RE.findall(content_html)
+        
+        # Run quality checks
+        self._check_toc_issues(toc_content, content_html)
+        self._check_repeated_footers(content_html)
+        self._check_table_formatting(content_html)
+        self._check_general_formatting(content_html, paragraphs)
+        self._check_blank_pages(html_files)
+        self._check_toc_placement(content_html)
+        self._check_excessive_line_breaks(paragraphs)
+        
         self._print_summary()
         return self.issues
     
-    def _get_main_content(self, epub):
+    def _get_main_content(self, html_files):
         """Extract main HTML content from all HTML files"""
         content = ""
         try:
             # Try common main file names first
             for filename in ['index.html', 'content.html', 'text.html']:
-                try:
-                    content = epub.read(filename).decode('utf-8')
-                    return content
-                except KeyError:
-                    continue
+                if filename in html_files:
+                    return html_files[filename].decode('utf-8')
             
             # If no main file found, combine all HTML files
-            html_files = [f for f in epub.namelist() if f.endswith('.html') or f.endswith('.xhtml')]
-            html_files = [f for f in html_files if not f.startswith('META-INF/')]  # Skip metadata
+            content_files = [f for f in html_files if not f.startswith('META-INF/')]  # Skip metadata
             
-            for html_file in sorted(html_files):  # Sort to get consistent order
+            for html_file in sorted(content_files):  # Sort to get consistent order
                 try:
-                    file_content = epub.read(html_file).decode('utf-8')
-                    content += file_content + "\n"
-                except:
+                    content += html_files[html_file].decode('utf-8') + "\n"
+                except UnicodeDecodeError:
                     continue
                     
             return content
-        except Exception as e:
+        except UnicodeDecodeError:
             return ""
     
-    def _get_toc_content(self, epub):
+    def _get_toc_content(self, toc):
         """Extract table of contents"""
+        if toc is None:
+            return ""
         try:
-            return epub.read('toc.ncx').decode('utf-8')
-        except:
+            return toc.decode('utf-8')
+        except UnicodeDecodeError:
             return ""
     
     def _check_toc_issues(self, toc_content, html_content):
@@ -75,22 +124,22 @@ class EpubQualityAnalyzer:
         # Parse TOC entries
         try:
             root = ET.fromstring(toc_content)
-            nav_points = root.findall('.//{http://www.daisy.org/z3986/2005/ncx/}navLabel/{http://www.daisy.org/z3986/2005/ncx/}text')
-            toc_entries = [point.text for point in nav_points if point.text]
             
-            # Check for meaningless entries
-            meaningless_patterns = [r'^\d+$', r'^\.\d+$', r'^↩$', r'^analysis section\)$']
+            # Count entries and meaningless entries as the labels are visited
+            entry_count = 0
             meaningless_count = 0
-            for entry in toc_entries:
-                if any(re.match(pattern, entry.strip()) for pattern in meaningless_patterns):
-                    meaningless_count += 1
+            for point in root.iterfind('.//{http://www.daisy.org/z3986/2005/ncx/}navLabel/{http://www.daisy.org/z3986/2005/ncx/}text'):
+                if point.text:
+                    entry_count += 1
+                    if _MEANINGLESS_TOC_RE.match(point.text.strip()):
+                        meaningless_count += 1
             
-            if meaningless_count > len(toc_entries) * 0.5:
-                self.issues.append(f"MAJOR: TOC has {meaningless_count}/{len(toc_entries)} meaningless entries")
+            if meaningless_count > entry_count * 0.5:
+                self.issues.append(f"MAJOR: TOC has {meaningless_count}/{entry_count} meaningless entries")
             
             # Check TOC placement (should be near beginning)
-            if 'toc' in html_content.lower():
-                toc_position = html_content.lower().find('toc')
+            toc_position = html_content.lower().find('toc')  # one case-folded copy
+            if toc_position != -1:
                 content_length = len(html_content)
                 if toc_position > content_length * 0.8:
                     self.issues.append("MAJOR: TOC appears at end of document instead of beginning")
@@ -100,38 +149,18 @@ class EpubQualityAnalyzer:
     
     def _check_repeated_footers(self, content):
         """Check for repeated footer/header content with enhanced detection"""
-        # Extract all paragraph text
-        paragraphs = re.findall(r'<p[^>]*>(.*?)</p>', content, re.DOTALL | re.IGNORECASE)
-        
-        # Clean paragraphs and count occurrences
-        cleaned_paragraphs = []
-        for p in paragraphs:
-            # Remove HTML tags and normalize whitespace
-            clean_text = re.sub(r'<[^>]+>', '', p).strip()
-            clean_text = re.sub(r'\s+', ' ', clean_text)
-            if len(clean_text) > 5:  # Only consider substantial content
-                cleaned_paragraphs.append(clean_text)
-        
-        # Count occurrences of each paragraph
-        paragraph_counts = Counter(cleaned_paragraphs)
+        # Count cleaned paragraphs in one streaming pass: tags removed, whitespace
+        # normalized, only substantial content (more than 5 characters) kept
+        paragraph_counts = Counter()
+        for match in _P_RE_ANY_CASE.finditer(content):
+            clean_text = ' '.join(_TAG_RE.sub('', match.group(1)).split())
+            if len(clean_text) > 5:
+                paragraph_counts[clean_text] += 1
         
         # Check for repeated content (appears 3+ times)
         for text, count in paragraph_counts.items():
             if count >= 3:
-                # Common footer patterns
-                footer_patterns = [
-                    r'manuscript submitted to',
-                    r'arxiv:',
-                    r'page \d+ of \d+',
-                    r'©.*\d{4}',
-                    r'proceedings of',
-                    r'conference on',
-                    r'https?://[^\s]+',
-                    r'acm.*\d{4}',
-                    r'ieee.*\d{4}'
-                ]
-                
-                is_footer = any(re.search(pattern, text.lower()) for pattern in footer_patterns)
+                is_footer = _FOOTER_RE.search(text.lower()) is not None
                 if is_footer or len(text) < 80:  # Short repeated text likely footer
                     self.issues.append(f"MAJOR: Repeated footer content '{text[:60]}...' appears {count} times")
                     break
@@ -139,8 +168,9 @@ class EpubQualityAnalyzer:
     def _check_table_formatting(self, content):
         """Check for table formatting issues"""
         # Count images vs actual tables
-        img_count = len(re.findall(r'<img[^>]*>', content))
-        table_count = len(re.findall(r'<table[^>]*>', content))
+        tag_counts = Counter(_IMG_OR_TABLE_RE.findall(content))
+        img_count = tag_counts['img']
+        table_count = tag_counts['table']
         
         if img_count > 5 and table_count == 0:
             self.issues.append("MINOR: Document has many images but no HTML tables - tables may be converted to images")
@@ -149,24 +179,27 @@ class EpubQualityAnalyzer:
         lines = content.split('\n')
         table_like_lines = 0
         for line in lines:
-            if re.search(r'<p[^>]*>.*\|.*\|.*</p>', line):  # Pipe-separated content
+            if _PIPE_P_RE.search(line):  # Pipe-separated content
                 table_like_lines += 1
         
         if table_like_lines > 3:
             self.issues.append("MINOR: Found table-like content in paragraphs instead of proper tables")
     
-    def _check_general_formatting(self, content):
+    def _check_general_formatting(self, content, paragraphs):
         """Check for general formatting issues"""
         # Excessive whitespace
-        excessive_breaks = len(re.findall(r'(<br[^>]*>\s*){3,}', content))
+        excessive_breaks = len(_BR_RUN_RE.findall(content))
         if excessive_breaks > 5:
             self.issues.append(f"MINOR: Found {excessive_breaks} instances of excessive line breaks")
         
         # Very short paragraphs (might indicate broken text flow)
-        paragraphs = re.findall(r'<p[^>]*>(.*?)</p>', content, re.DOTALL)
-        short_paragraphs = [p for p in paragraphs if len(p.strip()) < 10 and p.strip()]
-        if len(short_paragraphs) > len(paragraphs) * 0.3:
-            self.issues.append(f"MINOR: {len(short_paragraphs)} very short paragraphs may indicate text flow issues")
+        short_count = 0
+        for p in paragraphs:
+            stripped = p.strip()
+            if stripped and len(stripped) < 10:
+                short_count += 1
+        if short_count > len(paragraphs) * 0.3:
+            self.issues.append(f"MINOR: {short_count} very short paragraphs may indicate text flow issues")
     
     def _print_summary(self):
         """Print analysis summary"""
@@ -186,6 +219,13 @@ class EpubQualityAnalyzer:
                 for issue in issues:
                     print(f"  - {issue}")
 
+def _analyze_one(epub_file):
+    """Analyze one ePub in a worker process, capturing its report for in-order printing"""
+    report = io.StringIO()
+    with redirect_stdout(report):
+        issues = EpubQualityAnalyzer(epub_file).analyze()
+    return epub_file.name, issues, report.getvalue()
+
 def main():
     epub_dir = Path("epub_books")
     if not epub_dir.exists():
@@ -199,11 +239,12 @@ def main():
     
     print(f"Analyzing {len(epub_files)} ePub files...")
     
+    # Files are independent and the checks are CPU-bound: one worker process each
     all_issues = {}
-    for epub_file in epub_files:
-        analyzer = EpubQualityAnalyzer(epub_file)
-        issues = analyzer.analyze()
-        all_issues[epub_file.name] = issues
+    with ProcessPoolExecutor() as executor:
+        for name, issues, report in executor.map(_analyze_one, epub_files):
+            print(report, end='')
+            all_issues[name] = issues
     
     # Summary
     print(f"\n=== OVERALL SUMMARY ===")
@@ -215,24 +256,22 @@ def main():
         print(f"Files with issues: {len(files_with_issues)}/{len(epub_files)}")
 
 # Enhanced heuristics methods - add to EpubQualityAnalyzer class
-def _check_blank_pages(self, epub):
+def _check_blank_pages(self, html_files):
     """Check for blank or nearly empty pages"""
     try:
         # Check all HTML files in the ePub
-        html_files = [f for f in epub.namelist() if f.endswith('.html') or f.endswith('.xhtml')]
-        
         blank_pages = []
-        for html_file in html_files:
+        for html_file, data in html_files.items():
             try:
-                content = epub.read(html_file).decode('utf-8')
+                content = data.decode('utf-8')
                 # Remove HTML tags and whitespace
-                text_content = re.sub(r'<[^>]+>', '', content).strip()
-                text_content = re.sub(r'\s+', ' ', text_content)
+                text_content = _TAG_RE.sub('', content).strip()
+                text_content = _WS_RE.sub(' ', text_content)
                 
                 # Consider page blank if very little text content
                 if len(text_content) < 50:  # Less than 50 characters of actual text
                     blank_pages.append(html_file)
-            except:
+            except UnicodeDecodeError:
                 continue
         
         if len(blank_pages) >= 3:  # 3 or more blank pages is problematic
@@ -244,34 +283,23 @@ def _check_blank_pages(self, epub):
 def _check_toc_placement(self, content_html):
     """Check if table of contents appears at the end instead of beginning"""
     # Look for common TOC indicators
-    toc_patterns = [
-        r'table of contents',
-        r'contents',
-        r'outline',
-        r'<nav[^>]*>.*</nav>',
-        r'class=["\']toc["\']'
-    ]
-    
     content_length = len(content_html)
-    for pattern in toc_patterns:
-        matches = list(re.finditer(pattern, content_html, re.IGNORECASE))
-        for match in matches:
+    for pattern in _TOC_MARKER_RES:
+        for match in pattern.finditer(content_html):
             position = match.start()
             # If TOC appears in last 20% of document
             if position > content_length * 0.8:
                 self.issues.append("MAJOR: Table of contents appears at end of document instead of beginning")
                 return
 
-def _check_excessive_line_breaks(self, content_html):
+def _check_excessive_line_breaks(self, paragraphs):
     """Check for excessive line breaks in structured content like contact info"""
     # Look for patterns of many consecutive short paragraphs
-    paragraphs = re.findall(r'<p[^>]*>(.*?)</p>', content_html, re.DOTALL)
-    
     consecutive_short = 0
     max_consecutive = 0
     
     for p in paragraphs:
-        clean_text = re.sub(r'<[^>]+>', '', p).strip()
+        clean_text = _TAG_RE.sub('', p).strip()
         if len(clean_text) < 20 and len(clean_text) > 0:  # Very short but not empty
             consecutive_short += 1
             max_consecutive = max(max_consecutive, consecutive_short)
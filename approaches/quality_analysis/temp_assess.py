@@ -1,4 +1,4 @@
-from epub_quality_analyzer import EpubQualityAnalyzer
+from epub_quality_analyzer import EpubQualityAnalyzer, load_epub_assets
 from bedrock_quality_analyzer import BedrockQualityAnalyzer
 
 filename = "Evaluating Sakana's AI Scientist for Autonomous Research Wishful Thinking or an Emerging Reality Tow.epub"
@@ -6,14 +6,17 @@ filepath = f"epub_books/{filename}"
 
 print(f"=== Quality Assessment: {filename} ===")
 
+# Decompress the ePub once for both analyses
+assets = load_epub_assets(filepath)
+
 # Rule-based analysis
 print("\n--- Rule-Based Quality Analysis ---")
-analyzer = EpubQualityAnalyzer(filepath)
+analyzer = EpubQualityAnalyzer(filepath, assets)
 issues = analyzer.analyze()
 
 # Bedrock AI analysis
 print("\n--- AI-Powered Formatting Analysis ---")
-bedrock_analyzer = BedrockQualityAnalyzer(filepath)
+bedrock_analyzer = BedrockQualityAnalyzer(filepath, assets)
 bedrock_result = bedrock_analyzer.analyze_with_bedrock()
 
 if 'error' in bedrock_result:
@@ -2,9 +2,22 @@
 import json
 import subprocess
 import tempfile
-import base64
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import PyPDF2
+import boto3
+from botocore.config import Config
+
+# Roughly 4000 tokens of PDF text per restructuring request
+MAX_CHUNK_CHARS = 16000
+
+# One client per process: pooled keep-alive connections to Bedrock, adaptive
+# retries for throttling, and room for long (up to 8000-token) responses
+_bedrock = boto3.client('bedrock-runtime', region_name='us-east-1', config=Config(
+    max_pool_connections=16,
+    retries={'max_attempts': 5, 'mode': 'adaptive'},
+    read_timeout=300
+))
 
 def extract_pdf_with_claude(pdf_path):
     """Use Claude to extract and restructure content from problematic PDFs"""
@@ -14,12 +27,18 @@ def extract_pdf_with_claude(pdf_path):
         # Extract raw text from PDF
         with open(pdf_path, 'rb') as file:
             reader = PyPDF2.PdfReader(file)
-            raw_text = ""
-            for page in reader.pages:
-                raw_text += page.extract_text() + "\n"
+            page_texts = [page.extract_text() + "\n" for page in reader.pages]
         
-        # Use Claude to restructure the content
-        structured_content = restructure_with_claude(raw_text)
+        # Use Claude to restructure the content: long documents are split at page
+        # boundaries and the shorter chunks restructured concurrently; only the
+        # opening chunk is asked for the title and summary
+        chunks = _chunk_pages(page_texts)
+        if len(chunks) == 1:
+            structured_content = restructure_with_claude(chunks[0])
+        else:
+            continuation = [False] + [True] * (len(chunks) - 1)
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                structured_content = _merge_restructured(list(executor.map(restructure_with_claude, chunks, continuation)))
         
         if structured_content:
             return structured_content
@@ -29,10 +48,73 @@ def extract_pdf_with_claude(pdf_path):
     except Exception as e:
         return {"error": f"PDF extraction error: {e}"}
 
-def restructure_with_claude(raw_text):
-    """Use Claude to restructure fragmented PDF text"""
+def _chunk_pages(page_texts, max_chars=MAX_CHUNK_CHARS):
+    """Group consecutive page texts into chunks of at most max_chars (one page minimum)"""
+    chunks = []
+    current, current_len = [], 0
+    for text in page_texts:
+        if current and current_len + len(text) > max_chars:
+            chunks.append("".join(current))
+            current, current_len = [], 0
+        current.append(text)
+        current_len += len(text)
+    # Always at least one chunk, even for a PDF without extractable text
+    chunks.append("".join(current))
+    return chunks
+
+def _merge_restructured(parts):
+    """Combine per-chunk restructurings in document order; any failed chunk fails the whole"""
+    for part in parts:
+        if not part or "error" in part:
+            return part
+    
+    # Title and summary come from the opening chunk, sections from all of them
+    merged = {key: parts[0][key] for key in ("title", "summary") if key in parts[0]}
+    merged["sections"] = list(parts[0].get("sections", []))
+    for part in parts[1:]:
+        sections = list(part.get("sections", []))
+        # A continuation chunk that opens mid-section returns that text without a
+        # heading; it belongs to the last section of the previous chunk
+        if sections and not sections[0].get("heading") and merged["sections"]:
+            previous = dict(merged["sections"][-1])
+            previous["content"] = f"{previous.get('content', '')}\n\n{sections[0].get('content', '')}"
+            merged["sections"][-1] = previous
+            sections = sections[1:]
+        merged["sections"].extend(sections)
+    return merged
+
+def restructure_with_claude(raw_text, continuation=False):
+    """Use Claude to restructure fragmented PDF text
     
-    prompt = f"""You are helping convert a PDF document to ePub format. The PDF text extraction is fragmented and contains web interface elements. Please restructure this content into a clean, readable document.
+    With continuation set, raw_text is a later chunk of a longer document: only its
+    sections are requested, and text continuing a section from the previous chunk
+    comes back as a first section with an empty heading.
+    """
+    
+    if continuation:
+        prompt = f"""You are helping convert a PDF document to ePub format. The PDF text extraction is fragmented and contains web interface elements. The text below continues a longer document from where a previous part stopped, so it may begin partway through a section. Please restructure this content into clean, readable sections.
+
+Tasks:
+1. Remove web interface elements (New, Answer, Sources, Steps, etc.)
+2. Reconstruct fragmented text into coherent paragraphs
+3. Structure the sections that start in this text with their proper headings
+4. Fix broken sentences and word fragments
+5. Do not invent a title, introduction or summary for this part
+
+If the text begins in the middle of a section, return that opening text as the first section with an empty heading ("") instead of making up a heading for it.
+
+Raw extracted text:
+{raw_text}
+
+Please return a JSON object with:
+{{
+  "sections": [
+    {{"heading": "", "content": "text continuing the previous section"}},
+    {{"heading": "Section Name", "content": "paragraph content"}}
+  ]
+}}"""
+    else:
+        prompt = f"""You are helping convert a PDF document to ePub format. The PDF text extraction is fragmented and contains web interface elements. Please restructure this content into a clean, readable document.
 
 Tasks:
 1. Remove web interface elements (New, Answer, Sources, Steps, etc.)
@@ -65,38 +147,30 @@ Please return a JSON object with:
             }]
         }
         
-        body_json = json.dumps(body)
-        body_b64 = base64.b64encode(body_json.encode()).decode()
+        try:
+            response = _bedrock.invoke_model(
+                modelId='us.anthropic.claude-3-5-sonnet-20241022-v2:0',
+                body=json.dumps(body),
+                accept='application/json',
+                contentType='application/json'
+            )
+        except Exception as e:
+            return {"error": f"Claude call failed: {e}"}
         
-        cmd = f"""
-        bash -c 'source ~/workspace/.secure-agent/bin/aws-creds && 
-        ~/workspace/.secure-agent/tools/aws-v2-bin/aws bedrock-runtime invoke-model \
-            --model-id us.anthropic.claude-3-5-sonnet-20241022-v2:0 \
-            --region us-east-1 \
-            --body "{body_b64}" \
-            /tmp/claude_pdf_response.json'
-        """
+        response_body = json.loads(response['body'].read())
+        response_text = response_body['content'][0]['text'].strip()
         
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        # Handle JSON in markdown blocks
+        if "```json" in response_text:
+            json_start = response_text.find("```json") + 7
+            json_end = response_text.find("```", json_start)
+            if json_end > json_start:
+                response_text = response_text[json_start:json_end].strip()
         
-        if result.returncode == 0:
-            with open('/tmp/claude_pdf_response.json', 'r') as f:
-                response = json.load(f)
-                response_text = response['content'][0]['text'].strip()
-                
-                # Handle JSON in markdown blocks
-                if "```json" in response_text:
-                    json_start = response_text.find("```json") + 7
-                    json_end = response_text.find("```", json_start)
-                    if json_end > json_start:
-                        response_text = response_text[json_start:json_end].strip()
-                
-                try:
-                    return json.loads(response_text)
-                except json.JSONDecodeError:
-                    return {"error": "Could not parse Claude response", "raw": response_text}
-        else:
-            return {"error": f"Claude call failed: {result.stderr}"}
+        try:
+            return json.loads(response_text)
+        except json.JSONDecodeError:
+            return {"error": "Could not parse Claude response", "raw": response_text}
             
     except Exception as e:
         return {"error": f"Claude processing error: {e}"}
@@ -2,6 +2,7 @@
 import os
 import subprocess
 import re
+from functools import lru_cache
 from pathlib import Path
 try:
     import PyPDF2
@@ -9,6 +10,7 @@ except ImportError:
     print("PyPDF2 not found. Install with: pip3 install PyPDF2")
     exit(1)
 
+@lru_cache(maxsize=256)
 def clean_filename(title):
     """Clean title for use as filename"""
     # Remove invalid filename characters
@@ -18,6 +20,9 @@ def clean_filename(title):
     # Limit length
     return cleaned[:100] if len(cleaned) > 100 else cleaned
 
+# Cached per path: a PDF's title is needed for both the conversion and its output
+# name, and each lookup reopens the PDF and may call Bedrock
+@lru_cache(maxsize=256)
 def extract_title_from_pdf(pdf_path):
     """Extract title from PDF using AWS Bedrock Nova Micro"""
     try:
@@ -119,7 +124,8 @@ def convert_pdf_to_epub(pdf_path, output_dir="epub_books"):
         if title:
             cmd.extend(["--title", title])
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        # Only stderr is reported, so Calibre's progress output is not kept in memory
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
         
         if result.returncode == 0:
             display_title = title if title else pdf_file.stem
@@ -1,117 +1,267 @@
 #!/usr/bin/env python3
+import io
 import os
 import subprocess
 import re
+import shutil
 import zipfile
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
-from epub_quality_analyzer import EpubQualityAnalyzer
+from epub_quality_analyzer import EpubQualityAnalyzer, assets_from_members
 
 # Import existing functions
 from convert_to_epub import clean_filename, extract_title_from_pdf
 
-def convert_pdf_to_epub_improved(pdf_path, output_dir="epub_books"):
+try:
+    # Linear-time engine for the fixed cleaning patterns when available
+    import re2 as _scrub_re
+except ImportError:
+    _scrub_re = re
+
+# Cleaning patterns compiled once at import instead of on every call.
+# Case-insensitivity is inline so the same source compiles under re and re2.
+# Standalone date/time, URL and page-number ("1/10") footers in one alternation;
+# only the first two are case-insensitive, matching the original separate passes
+_RE_ALL_FOOTERS = _scrub_re.compile(
+    r'(?i:<p[^>]*>\s*(?:\d{1,2}/\d{1,2}/\d{2,4},?\s+\d{1,2}:\d{2}\s+[AP]M|https?://[^\s<]+)\s*</p>)'
+    r'|<p[^>]*>\s*\d+/\d+\s*</p>'
+)
+_RE_EMPTY_PARAS = _scrub_re.compile(r'(<p[^>]*>\s*</p>\s*){2,}')
+_RE_SINGLE_CHAR_PAIR = _scrub_re.compile(r'<p[^>]*>\s*[A-Za-z]\s*</p>\s*<p[^>]*>\s*[A-Za-z]\s*</p>')
+# Web interface elements left behind by screenshot conversions
+_RE_WEB_ELEMENTS = _scrub_re.compile(
+    r'(?i)<p[^>]*>\s*(?:New|Answer|Sources\s*·\s*\d+|Steps|Search)\s*</p>'
+)
+# Already-compressed media gains nothing from deflate, so it is stored as-is
+_MEDIA_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.woff', '.woff2', '.mp3', '.mp4')
+_RE_TAG = re.compile(r'<[^>]+>')
+_RE_QUOTED = re.compile(r"'([^']+)'")
+
+# Marks a title argument as not supplied; None already means "no title found"
+_UNSET = object()
+
+def _epub_name(pdf_path, title):
+    """ePub file name for a PDF: the cleaned title, or the PDF's stem without one"""
+    if title:
+        return clean_filename(title) + ".epub"
+    return Path(pdf_path).stem + ".epub"
+
+def _reserve_epub_name(epub_name, reserved):
+    """Return epub_name, numbered if needed, so it is unique within reserved, and reserve it
+    
+    Names are compared case-insensitively, as some file systems do.
+    """
+    stem = epub_name[:-len(".epub")]
+    candidate, number = epub_name, 2
+    while candidate.lower() in reserved:
+        candidate = f"{stem}_{number}.epub"
+        number += 1
+    reserved.add(candidate.lower())
+    return candidate
+
+def convert_pdf_to_epub_improved(pdf_path, output_dir="epub_books", title=_UNSET, epub_name=None):
     """Convert PDF to ePub with quality improvements"""
     pdf_file = Path(pdf_path)
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
     
-    # Extract title
-    title = extract_title_from_pdf(pdf_path)
-    if title:
-        epub_name = clean_filename(title) + ".epub"
-    else:
-        epub_name = pdf_file.stem + ".epub"
+    # Extract title unless the caller already did
+    if title is _UNSET:
+        title = extract_title_from_pdf(pdf_path)
     
-    epub_path = output_path / epub_name
+    epub_path = output_path / (epub_name or _epub_name(pdf_path, title))
     
     try:
-        # Step 1: Convert with improved Calibre parameters
-        cmd = [
-            "ebook-convert", str(pdf_file), str(epub_path),
-            "--no-default-epub-cover",
-            "--linearize-tables",
-        ]
-        
-        if title:
-            cmd.extend(["--title", title])
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            print(f"✗ Failed to convert {pdf_file.name}: {result.stderr}")
-            return False
-        
-        # Step 2: Post-process the ePub to fix quality issues
-        if post_process_epub(epub_path):
-            print(f"✓ Converted and improved: {pdf_file.name} → {epub_name}")
-            if title:
-                print(f"  Title: {title}")
-            return True
-        else:
-            print(f"⚠ Converted but post-processing failed: {pdf_file.name}")
-            return True
-            
+        job = _start_convert(pdf_path, epub_path, title)
+        return _finish_convert(job, pdf_path, epub_path, title)
     except Exception as e:
         print(f"✗ Error converting {pdf_file.name}: {e}")
         return False
 
+def _start_convert(pdf_path, epub_path, title):
+    """Launch the Calibre conversion in the background
+    
+    Returns the process, the temporary file collecting its stderr and the partial
+    ePub path Calibre writes to. Calibre's progress output on stdout is discarded,
+    and stderr goes to a file rather than a pipe so a verbose run never blocks
+    while nothing is reading it. The ePub only replaces epub_path once
+    _finish_convert sees Calibre succeed, so a killed or failed run never leaves
+    a truncated book behind.
+    """
+    # Keep the .epub suffix: Calibre picks the output format from it
+    partial_path = epub_path.with_suffix(".partial.epub")
+    
+    # Step 1: Convert with improved Calibre parameters
+    cmd = [
+        "ebook-convert", str(pdf_path), str(partial_path),
+        "--no-default-epub-cover",
+        "--linearize-tables",
+    ]
+    
+    if title:
+        cmd.extend(["--title", title])
+    
+    stderr_file = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=stderr_file)
+    except BaseException:
+        stderr_file.close()
+        raise
+    return proc, stderr_file, partial_path
+
+def _stop_convert(job):
+    """Kill a Calibre conversion started by _start_convert that is no longer wanted"""
+    proc, stderr_file, partial_path = job
+    proc.kill()
+    proc.wait()
+    stderr_file.close()
+    partial_path.unlink(missing_ok=True)
+
+def _finish_convert(job, pdf_path, epub_path, title):
+    """Wait for a Calibre conversion started by _start_convert and post-process its ePub"""
+    pdf_file = Path(pdf_path)
+    proc, stderr_file, partial_path = job
+    
+    with stderr_file:
+        if proc.wait() != 0:
+            partial_path.unlink(missing_ok=True)
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode('utf-8', errors='replace')
+            print(f"✗ Failed to convert {pdf_file.name}: {stderr}")
+            return False
+    
+    os.replace(partial_path, epub_path)
+    
+    # Step 2: Post-process the ePub to fix quality issues
+    if post_process_epub(epub_path):
+        print(f"✓ Converted and improved: {pdf_file.name} → {epub_path.name}")
+        if title:
+            print(f"  Title: {title}")
+        return True
+    else:
+        print(f"⚠ Converted but post-processing failed: {pdf_file.name}")
+        return True
+
 def post_process_epub(epub_path):
     """Post-process ePub to fix quality issues"""
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-            
-            # Extract ePub
-            with zipfile.ZipFile(epub_path, 'r') as epub:
-                epub.extractall(temp_path)
-            
-            # Fix main content
-            html_file = temp_path / "index.html"
-            if html_file.exists():
-                content = html_file.read_text(encoding='utf-8')
-                content = clean_html_content(content)
-                html_file.write_text(content, encoding='utf-8')
-            
-            # Rebuild ePub
-            with zipfile.ZipFile(epub_path, 'w', zipfile.ZIP_DEFLATED) as new_epub:
-                for file_path in temp_path.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(temp_path)
-                        new_epub.write(file_path, arcname)
-        
+        _rewrite_epub(epub_path, clean_html_content)
         return True
     except Exception as e:
         print(f"Post-processing error: {e}")
         return False
 
+def _member_info(info):
+    """Copy a member's ZipInfo for the rebuilt ePub, storing compressed media uncompressed"""
+    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+    new_info.external_attr = info.external_attr
+    if info.filename.lower().endswith(_MEDIA_SUFFIXES):
+        new_info.compress_type = zipfile.ZIP_STORED
+    else:
+        new_info.compress_type = info.compress_type
+    return new_info
+
+def _rewrite_epub(epub_path, html_transform):
+    """Rewrite an ePub in place, passing index.html through html_transform
+    
+    Returns the set of member names whose content changed; the ePub is left
+    untouched when the transform changes nothing.
+    """
+    epub_path = Path(epub_path)
+    with zipfile.ZipFile(epub_path, 'r') as epub:
+        if "index.html" not in epub.NameToInfo:
+            return set()
+        original = epub.read("index.html").decode('utf-8')
+        content = html_transform(original)
+        if content == original:
+            return set()
+        
+        with tempfile.NamedTemporaryFile(dir=epub_path.parent, suffix='.tmp', delete=False) as tmp:
+            tmp_path = Path(tmp.name)
+        try:
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as new_epub:
+                for info in epub.infolist():
+                    new_info = _member_info(info)
+                    if info.filename == "index.html":
+                        new_epub.writestr(new_info, content.encode('utf-8'))
+                    else:
+                        # Everything else is streamed across unchanged
+                        with epub.open(info) as src, new_epub.open(new_info, 'w') as dst:
+                            shutil.copyfileobj(src, dst)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+    
+    os.replace(tmp_path, epub_path)
+    return {"index.html"}
+
+def _read_epub(epub_path):
+    """Read an ePub into memory as its member list and a {name: bytes} dict"""
+    with zipfile.ZipFile(epub_path, 'r') as epub:
+        infos = epub.infolist()
+        return infos, {info.filename: epub.read(info) for info in infos}
+
+def _write_epub(epub_path, infos, members):
+    """Write ePub members held in memory back over epub_path, in their original order"""
+    epub_path = Path(epub_path)
+    with tempfile.NamedTemporaryFile(dir=epub_path.parent, suffix='.tmp', delete=False) as tmp:
+        tmp_path = Path(tmp.name)
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as new_epub:
+            for info in infos:
+                new_epub.writestr(_member_info(info), members[info.filename])
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, epub_path)
+
 def clean_html_content(content):
     """Clean HTML content to remove repeated footers and fix formatting"""
     
-    # Remove repeated date/time footers (only if they're standalone)
-    content = re.sub(r'<p[^>]*>\s*\d{1,2}/\d{1,2}/\d{2,4},?\s+\d{1,2}:\d{2}\s+[AP]M\s*</p>', '', content, flags=re.IGNORECASE)
-    
-    # Remove repeated URL footers - ONLY if they're standalone URLs, not mixed with content
-    content = re.sub(r'<p[^>]*>\s*https?://[^\s<]+\s*</p>', '', content, flags=re.IGNORECASE)
-    
-    # Remove page number footers like "1/10" (only if standalone)
-    content = re.sub(r'<p[^>]*>\s*\d+/\d+\s*</p>', '', content)
+    # Remove standalone date/time, URL and page-number footers in a single pass
+    content = _RE_ALL_FOOTERS.sub('', content)
     
     # Remove excessive whitespace
-    content = re.sub(r'(<p[^>]*>\s*</p>\s*){2,}', '', content)
+    content = _RE_EMPTY_PARAS.sub('', content)
     
     # Fix broken text flow (single characters on lines) - be more conservative
-    content = re.sub(r'<p[^>]*>\s*[A-Za-z]\s*</p>\s*<p[^>]*>\s*[A-Za-z]\s*</p>', '', content)
+    content = _RE_SINGLE_CHAR_PAIR.sub('', content)
     
     return content
 
-def analyze_and_convert(pdf_path, max_iterations=2):
-    """Convert PDF and iteratively improve quality"""
+def analyze_and_convert(pdf_path, max_iterations=2, title=_UNSET, epub_name=None):
+    """Convert PDF and iteratively improve quality
+    
+    title and epub_name may be supplied by a caller that already extracted the
+    title and reserved the output file name.
+    """
     print(f"\n=== Processing: {Path(pdf_path).name} ===")
     
+    # Extract the title once; both strategies and the output file name use it
+    if title is _UNSET:
+        title = extract_title_from_pdf(pdf_path)
+    output_path = Path("epub_books")
+    output_path.mkdir(exist_ok=True)
+    epub_name = epub_name or _epub_name(pdf_path, title)
+    epub_path = output_path / epub_name
+    
+    # Calibre needs nothing from the quality check, so start it now and let it
+    # run while the PDF is analyzed; it is killed if the PDF turns out unsuitable
+    try:
+        job = _start_convert(pdf_path, epub_path, title)
+    except Exception as e:
+        job, start_error = None, e
+    
     # Pre-conversion quality check
     from pdf_quality_detector import analyze_pdf_quality
-    pdf_analysis = analyze_pdf_quality(pdf_path)
+    try:
+        pdf_analysis = analyze_pdf_quality(pdf_path)
+    except BaseException:
+        if job:
+            _stop_convert(job)
+        raise
     
     print(f"PDF Quality Check: {'✓ Suitable' if pdf_analysis['suitable'] else '⚠ Issues detected'}")
     print(f"Text: {pdf_analysis['text_length']} chars, Academic score: {pdf_analysis['academic_score']}/9")
@@ -123,26 +273,31 @@ def analyze_and_convert(pdf_path, max_iterations=2):
     
     # Determine processing strategy based on PDF quality
     if not pdf_analysis['suitable']:
+        if job:
+            _stop_convert(job)
         print("\n⚠ PDF not suitable for standard conversion - applying enhanced processing")
-        return convert_problematic_pdf(pdf_path, pdf_analysis)
+        return convert_problematic_pdf(pdf_path, pdf_analysis, title=title, epub_name=epub_name)
     
     # Standard conversion for good PDFs
-    if not convert_pdf_to_epub_improved(pdf_path):
+    if job is None:
+        print(f"✗ Error converting {Path(pdf_path).name}: {start_error}")
+        return False
+    try:
+        if not _finish_convert(job, pdf_path, epub_path, title):
+            return False
+    except Exception as e:
+        print(f"✗ Error converting {Path(pdf_path).name}: {e}")
         return False
     
-    # Get the output file name
-    title = extract_title_from_pdf(pdf_path)
-    if title:
-        epub_name = clean_filename(title) + ".epub"
-    else:
-        epub_name = Path(pdf_path).stem + ".epub"
-    
-    epub_path = Path("epub_books") / epub_name
+    # From here the ePub is held in memory: the quality checks, targeted fixes
+    # and TOC fixes all work on one read of it, written back once at the end
+    infos, members = _read_epub(epub_path)
+    changed = set()
     
     # Iterative quality improvement
     for iteration in range(max_iterations):
         print(f"\n--- Quality Check (Iteration {iteration + 1}) ---")
-        analyzer = EpubQualityAnalyzer(epub_path)
+        analyzer = EpubQualityAnalyzer(epub_path, assets=assets_from_members(members))
         issues = analyzer.analyze()
         
         if not issues:
@@ -152,33 +307,33 @@ def analyze_and_convert(pdf_path, max_iterations=2):
         # Apply additional fixes based on detected issues
         if iteration < max_iterations - 1:
             print("Applying additional fixes...")
-            apply_targeted_fixes(epub_path, issues)
+            changed |= _apply_targeted_fixes_to_members(members, issues)
     
     # Apply TOC fixes if needed
     print("\n--- Applying TOC Improvements ---")
     from toc_fixer import TOCFixer
     toc_fixer = TOCFixer(epub_path)
-    toc_fixer.fix_toc()
+    changed |= toc_fixer.fix_members(members)
     
     # Final quality check
     print("\n--- Final Quality Check ---")
-    analyzer = EpubQualityAnalyzer(epub_path)
+    analyzer = EpubQualityAnalyzer(epub_path, assets=assets_from_members(members))
     final_issues = analyzer.analyze()
     
+    if changed:
+        _write_epub(epub_path, infos, members)
+    
     return True
 
-def convert_problematic_pdf(pdf_path, pdf_analysis):
+def convert_problematic_pdf(pdf_path, pdf_analysis, title=_UNSET, epub_name=None):
     """Enhanced conversion for problematic PDFs using Claude"""
-    pdf_file = Path(pdf_path)
     output_path = Path("epub_books")
     output_path.mkdir(exist_ok=True)
     
-    # Extract title
-    title = extract_title_from_pdf(pdf_path)
-    if title:
-        epub_name = clean_filename(title) + ".epub"
-    else:
-        epub_name = pdf_file.stem + ".epub"
+    # Extract title unless the caller already did
+    if title is _UNSET:
+        title = extract_title_from_pdf(pdf_path)
+    epub_name = epub_name or _epub_name(pdf_path, title)
     
     epub_path = output_path / epub_name
     
@@ -200,48 +355,19 @@ def convert_problematic_pdf(pdf_path, pdf_analysis):
         print(f"✗ Claude extraction failed: {claude_content['error']}")
         # Fallback to standard conversion
         print("Falling back to standard conversion...")
-        return convert_pdf_to_epub_improved(pdf_path)
+        return convert_pdf_to_epub_improved(pdf_path, title=title, epub_name=epub_name)
 
 def clean_web_screenshot_epub(epub_path):
     """Clean up ePub converted from web screenshot"""
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-            
-            # Extract ePub
-            with zipfile.ZipFile(epub_path, 'r') as epub:
-                epub.extractall(temp_path)
-            
-            # Clean HTML content
-            html_file = temp_path / "index.html"
-            if html_file.exists():
-                content = html_file.read_text(encoding='utf-8')
-                content = clean_web_screenshot_content(content)
-                html_file.write_text(content, encoding='utf-8')
-            
-            # Rebuild ePub
-            with zipfile.ZipFile(epub_path, 'w', zipfile.ZIP_DEFLATED) as new_epub:
-                for file_path in temp_path.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(temp_path)
-                        new_epub.write(file_path, arcname)
-        
+        _rewrite_epub(epub_path, clean_web_screenshot_content)
     except Exception as e:
         print(f"Web screenshot cleanup error: {e}")
 
 def clean_web_screenshot_content(content):
     """Clean HTML content from web screenshots"""
-    # Remove web interface elements
-    web_elements = [
-        r'<p[^>]*>\s*New\s*</p>',
-        r'<p[^>]*>\s*Answer\s*</p>',
-        r'<p[^>]*>\s*Sources\s*·\s*\d+\s*</p>',
-        r'<p[^>]*>\s*Steps\s*</p>',
-        r'<p[^>]*>\s*Search\s*</p>',
-    ]
-    
-    for pattern in web_elements:
-        content = re.sub(pattern, '', content, flags=re.IGNORECASE)
+    # Remove web interface elements in a single pass
+    content = _RE_WEB_ELEMENTS.sub('', content)
     
     # Fix fragmented text by joining single characters/short fragments
     lines = content.split('\n')
@@ -250,7 +376,7 @@ def clean_web_screenshot_content(content):
     
     for line in lines:
         # Extract text content from HTML line
-        text_content = re.sub(r'<[^>]+>', '', line).strip()
+        text_content = _RE_TAG.sub('', line).strip()
         
         # If it's a very short fragment, add to buffer
         if len(text_content) <= 3 and text_content.isalpha():
@@ -266,94 +392,111 @@ def clean_web_screenshot_content(content):
     
     return '\n'.join(cleaned_lines)
 
+def _remove_repeated_footers(content, issues):
+    """Drop paragraphs containing footer text the analyzer reported as repeated"""
+    # Extract the repeated content from each issue and remove it more aggressively,
+    # all texts in one alternation so the document is rewritten once
+    texts = []
+    for issue in issues:
+        if "Repeated footer content" in issue:
+            match = _RE_QUOTED.search(issue)
+            if match:
+                texts.append(re.escape(match.group(1)))
+    if texts:
+        pattern = re.compile(f'<p[^>]*>.*?(?:{"|".join(dict.fromkeys(texts))}).*?</p>', re.IGNORECASE)
+        content = pattern.sub('', content)
+    return content
+
 def apply_targeted_fixes(epub_path, issues):
-    """Apply targeted fixes based on detected issues"""
+    """Apply targeted fixes based on detected issues, returning the rewritten member names"""
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-            
-            with zipfile.ZipFile(epub_path, 'r') as epub:
-                epub.extractall(temp_path)
-            
-            html_file = temp_path / "index.html"
-            if html_file.exists():
-                content = html_file.read_text(encoding='utf-8')
-                
-                # Apply fixes based on specific issues
-                for issue in issues:
-                    if "Repeated footer content" in issue:
-                        # Extract the repeated content and remove it more aggressively
-                        match = re.search(r"'([^']+)'", issue)
-                        if match:
-                            repeated_text = re.escape(match.group(1))
-                            content = re.sub(f'<p[^>]*>.*?{repeated_text}.*?</p>', '', content, flags=re.IGNORECASE)
-                
-                html_file.write_text(content, encoding='utf-8')
-            
-            # Rebuild ePub
-            with zipfile.ZipFile(epub_path, 'w', zipfile.ZIP_DEFLATED) as new_epub:
-                for file_path in temp_path.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(temp_path)
-                        new_epub.write(file_path, arcname)
-        
+        return _rewrite_epub(epub_path, lambda content: _remove_repeated_footers(content, issues))
     except Exception as e:
         print(f"Targeted fix error: {e}")
-    """Apply targeted fixes based on detected issues"""
+        return set()
+
+def _apply_targeted_fixes_to_members(members, issues):
+    """apply_targeted_fixes for ePub members held in memory; returns the changed names"""
+    if "index.html" not in members:
+        return set()
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-            
-            with zipfile.ZipFile(epub_path, 'r') as epub:
-                epub.extractall(temp_path)
-            
-            html_file = temp_path / "index.html"
-            if html_file.exists():
-                content = html_file.read_text(encoding='utf-8')
-                
-                # Apply fixes based on specific issues
-                for issue in issues:
-                    if "Repeated footer content" in issue:
-                        # Extract the repeated content and remove it more aggressively
-                        match = re.search(r"'([^']+)'", issue)
-                        if match:
-                            repeated_text = re.escape(match.group(1))
-                            content = re.sub(f'<p[^>]*>.*?{repeated_text}.*?</p>', '', content, flags=re.IGNORECASE)
-                
-                html_file.write_text(content, encoding='utf-8')
-            
-            # Rebuild ePub
-            with zipfile.ZipFile(epub_path, 'w', zipfile.ZIP_DEFLATED) as new_epub:
-                for file_path in temp_path.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(temp_path)
-                        new_epub.write(file_path, arcname)
-        
+        content = members["index.html"].decode('utf-8')
+        fixed = _remove_repeated_footers(content, issues)
     except Exception as e:
         print(f"Targeted fix error: {e}")
+        return set()
+    if fixed == content:
+        return set()
+    members["index.html"] = fixed.encode('utf-8')
+    return {"index.html"}
 
-def main():
-    # Find all PDF files
-    pdf_files = []
-    for root, dirs, files in os.walk("."):
-        for file in files:
-            if file.lower().endswith('.pdf'):
-                pdf_files.append(os.path.join(root, file))
-    
-    if not pdf_files:
-        print("No PDF files found in the current directory.")
+def _extract_title(pdf_path):
+    """Extract one PDF's title in a worker process, capturing its log"""
+    log = io.StringIO()
+    with redirect_stdout(log):
+        title = extract_title_from_pdf(pdf_path)
+    return title, log.getvalue()
+
+def _convert_one(pdf_path, title, epub_name, title_log=""):
+    """Convert one PDF in a worker process, capturing its log for in-order printing"""
+    log = io.StringIO()
+    log.write(title_log)
+    with redirect_stdout(log):
+        ok = analyze_and_convert(pdf_path, title=title, epub_name=epub_name)
+    return pdf_path, ok, log.getvalue()
+
+def _iter_pdfs(root):
+    """Yield PDF paths under root in os.walk order, scanning with os.scandir"""
+    subdirs = []
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                # Like os.walk, symlinked directories are neither listed nor followed
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif entry.name.lower().endswith('.pdf'):
+                    yield entry.path
+    except OSError:
         return
-    
-    print(f"Found {len(pdf_files)} PDF files:")
-    for pdf in pdf_files:
-        print(f"  - {pdf}")
-    
-    print("\nConverting to ePub format with quality improvements...")
+    for subdir in subdirs:
+        yield from _iter_pdfs(subdir)
+
+def main():
     successful = 0
+    pdf_files = []
     
-    for pdf in pdf_files:
-        if analyze_and_convert(pdf):
-            successful += 1
+    # Each PDF is an independent Calibre/Claude job: one worker process each.
+    # Titles are extracted as soon as a PDF is found, while the scan runs
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        title_futures = []
+        for pdf in _iter_pdfs("."):
+            if not pdf_files:
+                print("Found PDF files:")
+            print(f"  - {pdf}")
+            pdf_files.append(pdf)
+            title_futures.append(executor.submit(_extract_title, pdf))
+        
+        if not pdf_files:
+            print("No PDF files found in the current directory.")
+            return
+        
+        print(f"\nConverting {len(pdf_files)} PDF files to ePub format with quality improvements...")
+        
+        # Output names are reserved here, in scan order, so PDFs sharing a title
+        # or file stem never convert into the same ePub at the same time
+        reserved = set()
+        futures = []
+        for pdf, title_future in zip(pdf_files, title_futures):
+            title, title_log = title_future.result()
+            epub_name = _reserve_epub_name(_epub_name(pdf, title), reserved)
+            futures.append(executor.submit(_convert_one, pdf, title, epub_name, title_log))
+        
+        for future in futures:
+            pdf, ok, log = future.result()
+            print(log, end='')
+            if ok:
+                successful += 1
     
     print(f"\n=== FINAL SUMMARY ===")
     print(f"Conversion complete: {successful}/{len(pdf_files)} files converted successfully")
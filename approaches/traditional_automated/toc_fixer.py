@@ -1,54 +1,72 @@
 #!/usr/bin/env python3
+import io
+import os
 import zipfile
 import tempfile
 import re
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
 
 class TOCFixer:
     def __init__(self, epub_path):
         self.epub_path = Path(epub_path)
     
     def fix_toc(self):
-        """Fix TOC issues in ePub file"""
+        """Fix TOC issues in ePub file, returning the names of the members it changed"""
+        with zipfile.ZipFile(self.epub_path, 'r') as epub:
+            members = {name: epub.read(name) for name in ("index.html", "toc.ncx")
+                       if name in epub.NameToInfo}
+            changed = self.fix_members(members)
+            if not changed:
+                return changed
+            
+            # Rebuild ePub from the source archive's own member list
+            with tempfile.NamedTemporaryFile(dir=self.epub_path.parent, suffix='.tmp', delete=False) as tmp:
+                tmp_path = Path(tmp.name)
+            try:
+                with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as new_epub:
+                    for info in epub.infolist():
+                        data = members[info.filename] if info.filename in changed else epub.read(info)
+                        new_epub.writestr(info, data)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+        
+        os.replace(tmp_path, self.epub_path)
+        return changed
+    
+    def fix_members(self, members):
+        """Fix TOC issues in ePub members held as {name: bytes}, in place
+        
+        Returns the names of the members it changed.
+        """
         print(f"Fixing TOC for {self.epub_path.name}")
+        changed = set()
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
+        # Analyze content and create better TOC
+        if "index.html" in members:
+            content = members["index.html"].decode('utf-8')
+            # Parsed once: sections are found and anchored in the same tree
+            soup = BeautifulSoup(content, 'html.parser')
+            sections = self._extract_sections(soup)
             
-            # Extract ePub
-            with zipfile.ZipFile(self.epub_path, 'r') as epub:
-                epub.extractall(temp_path)
-            
-            # Analyze content and create better TOC
-            html_file = temp_path / "index.html"
-            if html_file.exists():
-                content = html_file.read_text(encoding='utf-8')
-                sections = self._extract_sections(content)
+            if sections:
+                # Update TOC file
+                if "toc.ncx" in members:
+                    members["toc.ncx"] = self._update_toc(members["toc.ncx"], sections)
+                    changed.add("toc.ncx")
                 
-                if sections:
-                    # Update TOC file
-                    toc_file = temp_path / "toc.ncx"
-                    if toc_file.exists():
-                        self._update_toc_file(toc_file, sections)
-                    
-                    # Add TOC to beginning of HTML
-                    updated_content = self._add_toc_to_html(content, sections)
-                    html_file.write_text(updated_content, encoding='utf-8')
-            
-            # Rebuild ePub
-            with zipfile.ZipFile(self.epub_path, 'w', zipfile.ZIP_DEFLATED) as new_epub:
-                for file_path in temp_path.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(temp_path)
-                        new_epub.write(file_path, arcname)
+                # Add TOC to beginning of HTML
+                self._add_toc_to_html(soup, sections)
+                members["index.html"] = str(soup).encode('utf-8')
+                changed.add("index.html")
         
         print("✓ TOC fixed")
+        return changed
     
-    def _extract_sections(self, html_content):
-        """Extract meaningful sections from HTML content"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+    def _extract_sections(self, soup):
+        """Extract meaningful sections from parsed HTML content"""
         paragraphs = soup.find_all('p')
         
         sections = []
@@ -80,11 +98,11 @@ class TOCFixer:
         # Limit to reasonable number of sections
         return sections[:10]
     
-    def _update_toc_file(self, toc_file, sections):
-        """Update the TOC NCX file with better entries"""
+    def _update_toc(self, toc, sections):
+        """Return the TOC NCX document rebuilt with better entries"""
         try:
             # Parse existing TOC
-            tree = ET.parse(toc_file)
+            tree = ET.ElementTree(ET.fromstring(toc))
             root = tree.getroot()
             
             # Find navMap
@@ -108,41 +126,51 @@ class TOCFixer:
                     content_elem = ET.SubElement(nav_point, 'content')
                     content_elem.set('src', f"index.html#{section['anchor']}")
                 
-                # Write updated TOC
-                tree.write(toc_file, encoding='utf-8', xml_declaration=True)
+                # Serialize updated TOC
+                buffer = io.BytesIO()
+                tree.write(buffer, encoding='utf-8', xml_declaration=True)
+                return buffer.getvalue()
                 
         except Exception as e:
             print(f"Error updating TOC file: {e}")
+        
+        return toc
     
-    def _add_toc_to_html(self, html_content, sections):
-        """Add TOC at the beginning of HTML content"""
+    def _add_toc_to_html(self, soup, sections):
+        """Add TOC at the beginning of parsed HTML content, in place"""
         if not sections:
-            return html_content
+            return
+        
+        # Find the paragraphs before inserting the TOC so positions match _extract_sections
+        paragraphs = soup.find_all('p')
         
         # Create TOC HTML
         toc_html = '\n<div class="table-of-contents">\n<h2>Table of Contents</h2>\n<ul>\n'
         for section in sections:
             toc_html += f'<li><a href="#{section["anchor"]}">{section["title"]}</a></li>\n'
-        toc_html += '</ul>\n</div>\n\n'
+        toc_html += '</ul>\n</div>'
         
-        # Insert TOC after body tag
-        body_start = html_content.find('<body')
-        if body_start != -1:
-            body_end = html_content.find('>', body_start) + 1
-            html_content = html_content[:body_end] + toc_html + html_content[body_end:]
+        # Insert TOC after body tag. The blank lines that follow it join any text
+        # opening the body, and collapse to one newline if that is all whitespace,
+        # as the parser does for markup inserted ahead of the body's content.
+        body = soup.find('body')
+        if body is not None:
+            first = body.contents[0] if body.contents else None
+            if type(first) is NavigableString:
+                text = '\n\n' + first
+                first.replace_with(text if text.strip(' \n\t\f\r') else '\n')
+            else:
+                body.insert(0, NavigableString('\n'))
+            for node in reversed(list(BeautifulSoup(toc_html, 'html.parser').contents)):
+                body.insert(0, node.extract())
         
         # Add anchors to sections
-        soup = BeautifulSoup(html_content, 'html.parser')
-        paragraphs = soup.find_all('p')
-        
         for section in sections:
             if section['position'] < len(paragraphs):
                 p = paragraphs[section['position']]
                 # Add anchor before the paragraph
                 anchor = soup.new_tag('a', id=section['anchor'])
                 p.insert_before(anchor)
-        
-        return str(soup)
 
 def main():
     """Test TOC fixer on problematic files"""
@@ -6,8 +6,13 @@ Architecture: LaTeXML (professional conversion) + cognitive post-processing
 
 import json
 import hashlib
+import os
+import re
+import shutil
+import sqlite3
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
 from lxml import etree
 import boto3
@@ -16,42 +21,131 @@ import boto3
 sys.path.append(str(Path(__file__).parent / "structural_review"))
 from review_structure import StructuralReviewer
 
+# \input{...} / \include{...} commands in LaTeX sources
+_INCLUDE_RE = re.compile(r'\\(?:input|include)\{([^}]+)\}')
+# Bibliography year and first-author surname patterns
+_YEAR_RE = re.compile(r'\b(19|20)\d{2}\b')
+_AUTHOR_RE_1 = re.compile(r'^\s*[A-Z]\.\s*([A-Z][a-z]+),')          # "Y. Bengio,"
+_AUTHOR_RE_2 = re.compile(r'^\s*([A-Z][a-z]+),')                    # "Bengio, Y."
+_AUTHOR_RE_3 = re.compile(r'^\s*[A-Z]\.\s*([A-Z][a-z]+)\s+and')     # "R. Collobert and J. Weston"
+_FALLBACK_RE = re.compile(r'([A-Z][a-z]+)')
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# XPath queries over LaTeXML documents, compiled once
+_LTX_NS = {'ltx': 'http://dlmf.nist.gov/LaTeXML'}
+_GRAPHICS_XP = etree.XPath('.//ltx:graphics', namespaces=_LTX_NS)
+_LABELED_XP = etree.XPath('//ltx:table[@labels] | //ltx:equation[@labels] | //ltx:figure[@labels]',
+                          namespaces=_LTX_NS)
+_REFNUM_XP = etree.XPath('.//ltx:tag[@role="refnum"]', namespaces=_LTX_NS)
+_REFS_XP = etree.XPath('//ltx:ref', namespaces=_LTX_NS)
+_CITES_XP = etree.XPath('//ltx:cite', namespaces=_LTX_NS)
+_BIBITEMS_XP = etree.XPath('.//ltx:bibitem', namespaces=_LTX_NS)
+_BIBREFS_XP = etree.XPath('.//ltx:bibref', namespaces=_LTX_NS)
+_CITE_REFS_XP = etree.XPath('.//ltx:ref', namespaces=_LTX_NS)
+
+# Lenient parser for XML returned by the LLM, which may contain stray markup or bare ampersands
+_RECOVER_PARSER = etree.XMLParser(recover=True)
+
+# How a reference to each labelled element type reads
+_LABEL_FORMATS = {
+    '{http://dlmf.nist.gov/LaTeXML}table': "Table {}",
+    '{http://dlmf.nist.gov/LaTeXML}equation': "Equation ({})",
+    '{http://dlmf.nist.gov/LaTeXML}figure': "Figure {}",
+}
+
+# Idle seconds before a latexmls daemon started by latexmlc shuts itself down
+_LATEXMLS_EXPIRE = 60
+
+# How much of a failed LaTeXML run's stderr to report
+_STDERR_TAIL_BYTES = 8192
+
+def _run_quiet(cmd, timeout, cwd=None):
+    """Run a LaTeXML tool, discarding stdout and keeping only the tail of stderr
+    
+    Returns the exit code and the last _STDERR_TAIL_BYTES of stderr. stderr goes to
+    a temporary file rather than a pipe, so tens of MB of warnings are neither held
+    in memory nor able to block the process while nothing is reading them.
+    """
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=stderr_file, cwd=cwd)
+        try:
+            returncode = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            raise
+        
+        size = stderr_file.seek(0, os.SEEK_END)
+        stderr_file.seek(max(0, size - _STDERR_TAIL_BYTES))
+        return returncode, stderr_file.read().decode('utf-8', errors='replace')
+
 class BedrockClient:
     """Clean Bedrock client with caching and Converse API"""
     
     def __init__(self):
         self.client = None
+        # Prompt tokens served from Bedrock's prompt cache across all calls
+        self.cache_read_tokens = 0
+        self.cache_db = None
         
     def _get_client(self):
         if not self.client:
             self.client = boto3.client('bedrock-runtime', region_name='us-east-1')
         return self.client
     
+    def _get_cache_db(self):
+        # One indexed table instead of a JSON file per response in output/
+        if not self.cache_db:
+            cache_path = Path("output") / "bedrock_cache.db"
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.cache_db = sqlite3.connect(str(cache_path))
+            self.cache_db.execute('CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT)')
+        return self.cache_db
+    
+    def _read_legacy_cache(self, cache_content: str):
+        """Result stored by the older one-JSON-file-per-call cache, if any"""
+        legacy_key = hashlib.md5(cache_content.encode()).hexdigest()
+        cache_file = Path("output") / f"bedrock_cache_{legacy_key}.json"
+        if cache_file.exists():
+            with open(cache_file, 'r') as f:
+                return json.load(f)['result']
+        return None
+    
     def call_llm(self, prompt: str, input_text: str, model_id: str = 'us.anthropic.claude-sonnet-4-20250514-v1:0', max_tokens: int = 4000) -> str:
         """Call Bedrock LLM with automatic caching"""
         # Create cache key from model + prompt + input + max_tokens
         cache_content = f"{model_id}:{prompt}:{input_text}:{max_tokens}"
-        cache_key = hashlib.md5(cache_content.encode()).hexdigest()
-        cache_file = Path("output") / f"bedrock_cache_{cache_key}.json"
+        cache_key = hashlib.blake2b(cache_content.encode(), digest_size=16).hexdigest()
         
-        # Check cache first
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'r') as f:
-                    cached = json.load(f)
-                    return cached['result']
-            except Exception:
-                pass
+        # Check cache first, importing any entry left by the older file cache
+        try:
+            db = self._get_cache_db()
+            row = db.execute('SELECT value FROM kv WHERE key = ?', (cache_key,)).fetchone()
+            if row:
+                return row[0]
+            legacy = self._read_legacy_cache(cache_content)
+            if legacy is not None:
+                with db:
+                    db.execute('INSERT OR REPLACE INTO kv VALUES (?, ?)', (cache_key, legacy))
+                return legacy
+        except Exception:
+            pass
         
         try:
             client = self._get_client()
             
-            # Use Converse API
+            # Use Converse API. The instructions are a fixed prefix followed by a
+            # cache point, so repeated calls with the same prompt can read it from
+            # Bedrock's prompt cache; only the input varies in the user message.
             response = client.converse(
                 modelId=model_id,
+                system=[
+                    {'text': prompt},
+                    {'cachePoint': {'type': 'default'}}
+                ],
                 messages=[{
                     'role': 'user',
-                    'content': [{'text': f"{prompt}\n\nInput:\n{input_text}"}]
+                    'content': [{'text': f"Input:\n{input_text}"}]
                 }],
                 inferenceConfig={
                     'maxTokens': max_tokens,
@@ -60,12 +154,13 @@ class BedrockClient:
             )
             
             result_text = response['output']['message']['content'][0]['text']
+            self.cache_read_tokens += response.get('usage', {}).get('cacheReadInputTokens', 0)
             
             # Cache the result
             try:
-                cache_file.parent.mkdir(parents=True, exist_ok=True)
-                with open(cache_file, 'w') as f:
-                    json.dump({'result': result_text}, f)
+                db = self._get_cache_db()
+                with db:
+                    db.execute('INSERT OR REPLACE INTO kv VALUES (?, ?)', (cache_key, result_text))
             except Exception as e:
                 print(f"   ⚠️ Cache write failed: {e}")
             
@@ -89,6 +184,10 @@ class LaTeXMLConverter:
         
         self.stats = {}
         self.bedrock = BedrockClient()
+        # Expanded LaTeX per (resolved path, mtime), shared by files included more than once
+        self._expand_cache = {}
+        # LaTeXML output, parsed once and written back once after all in-memory fixes
+        self._tree = None
     
     def _ensure_expanded_latex(self, latex_path: str) -> str:
         """Expand LaTeX file if needed, return path to expanded version"""
@@ -154,8 +253,7 @@ class LaTeXMLConverter:
                 content = f.read()
             
             # Find all input/include commands
-            import re
-            includes = re.findall(r'\\(?:input|include)\{([^}]+)\}', content)
+            includes = _INCLUDE_RE.findall(content)
             
             for include in includes:
                 include_path = main_file.parent / f"{include}.tex"
@@ -167,9 +265,18 @@ class LaTeXMLConverter:
         
         return True
     
-    def _expand_latex_recursive(self, latex_file: Path) -> str:
+    def _expand_latex_recursive(self, latex_file: Path, missing: list = None) -> str:
         """Recursively expand all input/include commands"""
+        # The outermost call collects missing includes and reports them once
+        top_level = missing is None
+        if top_level:
+            missing = []
+        
         try:
+            cache_key = (latex_file.resolve(), latex_file.stat().st_mtime_ns)
+            if cache_key in self._expand_cache:
+                return self._expand_cache[cache_key]
+            
             with open(latex_file, 'r', encoding='utf-8') as f:
                 content = f.read()
         except Exception as e:
@@ -177,8 +284,6 @@ class LaTeXMLConverter:
             return ""
         
         # Replace input/include commands
-        import re
-        
         def replace_include(match):
             include_file = match.group(1)
             # Handle both with and without .tex extension
@@ -189,14 +294,19 @@ class LaTeXMLConverter:
             
             if include_path.exists():
                 # Recursively expand the included file
-                included_content = self._expand_latex_recursive(include_path)
+                included_content = self._expand_latex_recursive(include_path, missing)
                 return f"% Expanded from {include_file}\n{included_content}\n% End of {include_file}\n"
             else:
-                print(f"   ⚠️ Include file not found: {include_path}")
+                missing.append(include_path)
                 return match.group(0)  # Keep original if file not found
         
         # Replace both \input{} and \include{} commands
-        content = re.sub(r'\\(?:input|include)\{([^}]+)\}', replace_include, content)
+        content = _INCLUDE_RE.sub(replace_include, content)
+        self._expand_cache[cache_key] = content
+        
+        if top_level and missing:
+            more = "..." if len(missing) > 5 else ""
+            print(f"   ⚠️ {len(missing)} include file(s) not found: {', '.join(str(p) for p in missing[:5])}{more}")
         
         return content
     
@@ -219,6 +329,7 @@ class LaTeXMLConverter:
         # Phase 2: Cognitive enhancement
         print("🧠 Phase 2: Cognitive enhancement...")
         self._cognitive_enhancement()
+        self._write_tree()
         
         # Phase 3: Quality assessment
         print("🔍 Phase 3: Quality assessment...")
@@ -237,15 +348,35 @@ class LaTeXMLConverter:
             latex_filename = self.latex_file.name
             xml_output_path = self.xml_file.resolve()
             
+            if shutil.which('latexmls'):
+                # One latexmlc call converts and post-processes through a latexmls daemon,
+                # which keeps Perl and the loaded .sty bindings warm for the next paper
+                cmd = ['latexmlc', f'--expire={_LATEXMLS_EXPIRE}', '--post', '--pmml',
+                       f'--dest={xml_output_path}', str(self.latex_file.resolve())]
+                print(f"   Running: {' '.join(cmd)} (from {latex_dir})")
+                
+                returncode, stderr = _run_quiet(cmd, timeout=180, cwd=latex_dir)
+                
+                if returncode != 0:
+                    print(f"   ❌ LaTeXML failed with return code {returncode}")
+                    print(f"   STDERR: {stderr}")
+                    return False
+                
+                # Process figures after LaTeXML is complete
+                self._process_figures_only()
+                
+                print(f"   ✅ LaTeXML with MathML completed successfully")
+                return True
+            
             # Step 1: latexml
             cmd = ['latexml', '--dest', str(xml_output_path), latex_filename]
             print(f"   Running: {' '.join(cmd)} (from {latex_dir})")
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120, cwd=latex_dir)
+            returncode, stderr = _run_quiet(cmd, timeout=120, cwd=latex_dir)
             
-            if result.returncode != 0:
-                print(f"   ❌ LaTeXML failed with return code {result.returncode}")
-                print(f"   STDERR: {result.stderr}")
+            if returncode != 0:
+                print(f"   ❌ LaTeXML failed with return code {returncode}")
+                print(f"   STDERR: {stderr}")
                 return False
             
             # Process citations and figures while preserving LaTeXML bibliography
@@ -254,10 +385,10 @@ class LaTeXMLConverter:
             # Step 2: latexmlpost for MathML
             print(f"   Converting math to MathML...")
             post_cmd = ['latexmlpost', '--pmml', '--dest', str(xml_output_path), str(xml_output_path)]
-            post_result = subprocess.run(post_cmd, capture_output=True, text=True, timeout=60)
+            post_returncode, post_stderr = _run_quiet(post_cmd, timeout=60)
             
-            if post_result.returncode != 0:
-                print(f"   ❌ MathML conversion failed: {post_result.stderr}")
+            if post_returncode != 0:
+                print(f"   ❌ MathML conversion failed: {post_stderr}")
                 return False
             
             # Process figures after LaTeXML is complete
@@ -273,12 +404,22 @@ class LaTeXMLConverter:
             print(f"   ❌ LaTeXML error: {e}")
             return False
     
+    def _load_tree(self):
+        """Return the parsed LaTeXML output, parsing it on first use"""
+        if self._tree is None:
+            self._tree = etree.parse(str(self.xml_file))
+        return self._tree
+    
+    def _write_tree(self):
+        """Write the in-memory LaTeXML tree back to the XML file, if it was loaded"""
+        if self._tree is not None:
+            self._tree.write(str(self.xml_file), encoding='utf-8', pretty_print=True, xml_declaration=True)
+    
     def _process_figures_only(self):
         """Process figures: copy existing PNGs from subdirectories"""
         try:
-            root = etree.parse(str(self.xml_file)).getroot()
-            ns = {'ltx': 'http://dlmf.nist.gov/LaTeXML'}
-            graphics = root.xpath('.//ltx:graphics', namespaces=ns)
+            root = self._load_tree().getroot()
+            graphics = _GRAPHICS_XP(root)
             
             for graphic in graphics:
                 graphic_name = graphic.get('graphic')
@@ -289,16 +430,12 @@ class LaTeXMLConverter:
                     
                     if png_source.exists():
                         print(f"   🖼️ Copying PNG: {png_source.name}")
-                        import shutil
                         shutil.copy2(png_source, png_dest)
                         
                         # Update XML to point to flattened filename
                         graphic.set('candidates', Path(graphic_name).name)
                         graphic.set('graphic', Path(graphic_name).stem)
             
-            # Save updated XML with figure paths
-            etree.ElementTree(root).write(str(self.xml_file), encoding='utf-8', xml_declaration=True)
-            
         except Exception as e:
             print(f"   ⚠️ Figure processing failed: {e}")
     
@@ -317,13 +454,16 @@ class LaTeXMLConverter:
             # Phase 1: Build author-year mapping from bibliography
             ref_key_to_citation = {}
             author_year_counts = {}
+            # Keyed bibblocks with text, kept for tagging so the bibliography is walked once
+            keyed_bibblocks = []
             
-            bibitems = root.xpath('.//ltx:bibitem', namespaces=ns)
+            bibitems = _BIBITEMS_XP(root)
             for bibitem in bibitems:
                 key = bibitem.get('key')
                 if key:
                     bibblock = bibitem.find('.//ltx:bibblock', namespaces=ns)
                     if bibblock is not None and bibblock.text:
+                        keyed_bibblocks.append((key, bibblock))
                         author_year = self._extract_author_year_regex(bibblock.text)
                         
                         # Track duplicates
@@ -338,10 +478,10 @@ class LaTeXMLConverter:
                         ref_key_to_citation[key] = key
             
             # Phase 2: Apply citations using pre-computed mapping
-            citations = root.xpath('//ltx:cite', namespaces=ns)
+            citations = _CITES_XP(root)
             
             for cite in citations:
-                bibrefs = cite.xpath('.//ltx:bibref', namespaces=ns)
+                bibrefs = _BIBREFS_XP(cite)
                 
                 if bibrefs:
                     citation_parts = []
@@ -380,7 +520,7 @@ class LaTeXMLConverter:
                     parent.remove(first_bib)
             
             # Add author+year tags to bibliography entries for easy matching
-            self._add_author_year_tags(root, ref_key_to_citation, ns)
+            self._add_author_year_tags(keyed_bibblocks, ref_key_to_citation)
             
             # Save the updated XML only if no bibliography section exists
             existing_bib = root.find('.//ltx:bibliography', namespaces=ns)
@@ -395,27 +535,25 @@ class LaTeXMLConverter:
     
     def _extract_author_year_regex(self, bibblock_text):
         """Extract author surname and year using regex"""
-        import re
-        
         # Extract year (very reliable)
-        year_match = re.search(r'\b(19|20)\d{2}\b', bibblock_text)
+        year_match = _YEAR_RE.search(bibblock_text)
         year = year_match.group(0) if year_match else ""
         
         # Extract first author surname - try common patterns
         author = None
         
         # Pattern 1: "Y. Bengio," -> "Bengio"
-        author_match = re.search(r'^\s*[A-Z]\.\s*([A-Z][a-z]+),', bibblock_text.strip())
+        author_match = _AUTHOR_RE_1.search(bibblock_text.strip())
         if author_match:
             author = author_match.group(1)
         else:
             # Pattern 2: "Bengio, Y." -> "Bengio"  
-            author_match = re.search(r'^\s*([A-Z][a-z]+),', bibblock_text.strip())
+            author_match = _AUTHOR_RE_2.search(bibblock_text.strip())
             if author_match:
                 author = author_match.group(1)
             else:
                 # Pattern 3: "R. Collobert and J. Weston" -> "Collobert"
-                author_match = re.search(r'^\s*[A-Z]\.\s*([A-Z][a-z]+)\s+and', bibblock_text.strip())
+                author_match = _AUTHOR_RE_3.search(bibblock_text.strip())
                 if author_match:
                     author = author_match.group(1)
         
@@ -423,27 +561,25 @@ class LaTeXMLConverter:
             return f"{author}{year}"
         else:
             # Fallback: use any capitalized word + year
-            fallback_match = re.search(r'([A-Z][a-z]+)', bibblock_text)
+            fallback_match = _FALLBACK_RE.search(bibblock_text)
             fallback_author = fallback_match.group(1) if fallback_match else "Unknown"
             return f"{fallback_author}{year}"
     
-    def _add_author_year_tags(self, root, ref_key_to_citation, ns):
-        """Add author+year tags to bibliography entries"""
+    def _add_author_year_tags(self, keyed_bibblocks, ref_key_to_citation):
+        """Add author+year tags to bibliography entries
+        
+        keyed_bibblocks holds the (key, bibblock) pairs collected while the
+        author-year mapping was built.
+        """
         try:
-            # Find all bibliography items
-            bibitems = root.xpath('.//ltx:bibitem', namespaces=ns)
-            
-            for bibitem in bibitems:
-                key = bibitem.get('key')
-                if key and key in ref_key_to_citation:
+            for key, bibblock in keyed_bibblocks:
+                if key in ref_key_to_citation:
                     # Get the author+year format for this entry
                     author_year = ref_key_to_citation[key]
                     
                     # Add author+year to the beginning of bibblock text
-                    bibblock = bibitem.find('.//ltx:bibblock', namespaces=ns)
-                    if bibblock is not None and bibblock.text:
-                        if not bibblock.text.strip().startswith(author_year):
-                            bibblock.text = f"{author_year}: {bibblock.text.strip()}"
+                    if not bibblock.text.strip().startswith(author_year):
+                        bibblock.text = f"{author_year}: {bibblock.text.strip()}"
                             
         except Exception as e:
             print(f"   ⚠️ Failed to add author+year tags: {e}")
@@ -501,9 +637,7 @@ class LaTeXMLConverter:
     def _cognitive_enhancement(self):
         """Cognitive enhancement of LaTeXML output - fix references and citations only"""
         try:
-            # Parse the XML
-            tree = etree.parse(str(self.xml_file))
-            root = tree.getroot()
+            root = self._load_tree().getroot()
             
             # Extract statistics first
             self._extract_stats(root)
@@ -520,9 +654,6 @@ class LaTeXMLConverter:
             # Add any necessary IDs
             self._add_ids_if_needed(root)
             
-            # Save enhanced XML
-            tree.write(str(self.xml_file), encoding='utf-8', pretty_print=True, xml_declaration=True)
-            
             print(f"   ✅ Cognitive enhancement complete")
             
         except Exception as e:
@@ -533,124 +664,126 @@ class LaTeXMLConverter:
         ns = {'ltx': 'http://dlmf.nist.gov/LaTeXML'}
         creators = root.xpath('//ltx:creator[@role="author"]', namespaces=ns)
         
+        # Collect every author block first so they are cleaned in a single call
+        pending = []
         for creator in creators:
             personname = creator.find('.//ltx:personname', namespaces=ns)
             if personname is not None:
                 # Get the messy content
                 messy_content = etree.tostring(personname, encoding='unicode', method='xml')
-                
-                prompt = '''Parse this messy author information from LaTeX/XML and extract clean author names with their institutions and emails.
+                pending.append((creator, messy_content))
+        
+        if not pending:
+            return
+        
+        prompt = '''Parse these messy author blocks from LaTeX/XML and extract clean author names with their institutions and emails.
+Each block is wrapped in an <entry index="N"> element.
 The ERROR elements with \\And and \\AND are author separators.
-Return only clean XML with separate creator elements for each author.
+Return only clean XML with separate creator elements for each author, keeping each block's index.
 
-Return format: <creators><creator><name>First Last</name><institution>Institution Name</institution><email>email@domain.com</email></creator></creators>'''
-                
+Return format: <batch><entry index="0"><creators><creator><name>First Last</name><institution>Institution Name</institution><email>email@domain.com</email></creator></creators></entry></batch>'''
+        
+        batch_input = "\n".join(f'<entry index="{i}">{messy_content}</entry>'
+                                 for i, (_, messy_content) in enumerate(pending))
+        
+        try:
+            result = self.bedrock.call_llm(prompt, batch_input, 'us.anthropic.claude-sonnet-4-20250514-v1:0', max_tokens=8000)
+            
+            # Parse the result and create separate creator elements
+            batch_start = result.find('<batch>')
+            batch_end = result.rfind('</batch>')
+            if batch_start != -1 and batch_end > batch_start:
                 try:
-                    result = self.bedrock.call_llm(prompt, messy_content, 'us.anthropic.claude-sonnet-4-20250514-v1:0')
+                    # Parse the batch XML straight into lxml, the same library as the document
+                    batch_root = etree.fromstring(result[batch_start:batch_end + 8].encode('utf-8'), _RECOVER_PARSER)
+                    if batch_root is None:
+                        raise ValueError("no parsable <batch> element")
                     
-                    # Parse the result and create separate creator elements
-                    if '<creators>' in result and '</creators>' in result:
-                        try:
-                            from xml.etree import ElementTree as ET
-                            # Extract the creators XML
-                            creators_xml = result[result.find('<creators>'):result.find('</creators>') + 11]
-                            creators_root = ET.fromstring(creators_xml)
-                            
-                            # Get the parent of the current creator element
-                            parent = creator.getparent()
-                            creator_index = list(parent).index(creator)
-                            
-                            # Remove the original creator
-                            parent.remove(creator)
-                            
-                            # Add new creator elements for each author
-                            for i, author_elem in enumerate(creators_root.findall('creator')):
-                                new_creator = etree.Element('{http://dlmf.nist.gov/LaTeXML}creator')
-                                new_creator.set('role', 'author')
-                                
-                                new_personname = etree.SubElement(new_creator, '{http://dlmf.nist.gov/LaTeXML}personname')
-                                
-                                # Add name
-                                name = author_elem.find('name')
-                                if name is not None:
-                                    new_personname.text = name.text
-                                
-                                # Add institution
-                                institution = author_elem.find('institution')
-                                if institution is not None:
-                                    br1 = etree.SubElement(new_personname, '{http://dlmf.nist.gov/LaTeXML}break')
-                                    br1.tail = institution.text
-                                
-                                # Add email
-                                email = author_elem.find('email')
-                                if email is not None:
-                                    br2 = etree.SubElement(new_personname, '{http://dlmf.nist.gov/LaTeXML}break')
-                                    email_elem = etree.SubElement(new_personname, '{http://dlmf.nist.gov/LaTeXML}text')
-                                    email_elem.set('font', 'typewriter')
-                                    email_elem.text = email.text
-                                
-                                # Insert the new creator at the correct position
-                                parent.insert(creator_index + i, new_creator)
-                            
-                            print(f"   ✅ Created separate creator elements for each author")
-                            
-                        except Exception as parse_error:
-                            print(f"   ⚠️ XML parsing failed: {parse_error}")
-                            # Keep original if parsing fails
+                    cleaned = {entry.get('index'): entry.find('creators') for entry in batch_root.findall('entry')}
+                    for i, (creator, _) in enumerate(pending):
+                        creators_root = cleaned.get(str(i))
+                        if creators_root is None:
+                            print(f"   ⚠️ No cleaned authors returned for author block {i}")
+                            # Keep original if the block is missing
+                            continue
+                        self._replace_creator(creator, creators_root)
+                        print(f"   ✅ Created separate creator elements for each author")
                     
-                    else:
-                        print(f"   ⚠️ No valid XML structure in result")
-                        
-                except Exception as e:
-                    print(f"   ⚠️ Author cleaning failed: {e}")
+                except Exception as parse_error:
+                    print(f"   ⚠️ XML parsing failed: {parse_error}")
+                    # Keep original if parsing fails
+            
+            else:
+                print(f"   ⚠️ No valid XML structure in result")
+                
+        except Exception as e:
+            print(f"   ⚠️ Author cleaning failed: {e}")
+    
+    def _replace_creator(self, creator, creators_root):
+        """Replace one messy creator element with a clean one per parsed author"""
+        # Add new creator elements for each author
+        for author_elem in creators_root.findall('creator'):
+            new_creator = etree.Element('{http://dlmf.nist.gov/LaTeXML}creator')
+            new_creator.set('role', 'author')
+            
+            new_personname = etree.SubElement(new_creator, '{http://dlmf.nist.gov/LaTeXML}personname')
+            
+            # Add name
+            name = author_elem.find('name')
+            if name is not None:
+                new_personname.text = name.text
+            
+            # Add institution
+            institution = author_elem.find('institution')
+            if institution is not None:
+                br1 = etree.SubElement(new_personname, '{http://dlmf.nist.gov/LaTeXML}break')
+                br1.tail = institution.text
+            
+            # Add email
+            email = author_elem.find('email')
+            if email is not None:
+                br2 = etree.SubElement(new_personname, '{http://dlmf.nist.gov/LaTeXML}break')
+                email_elem = etree.SubElement(new_personname, '{http://dlmf.nist.gov/LaTeXML}text')
+                email_elem.set('font', 'typewriter')
+                email_elem.text = email.text
+            
+            # Insert the new creator in front of the original one, keeping author order
+            creator.addprevious(new_creator)
+        
+        # Remove the original creator
+        creator.getparent().remove(creator)
     
     def _fix_references_cognitively(self, root):
         """Fix cross-references using LaTeXML's label system"""
-        ns = {'ltx': 'http://dlmf.nist.gov/LaTeXML'}
-        
         # Build label mapping from LaTeXML elements
         label_map = {}
         
-        # Find tables with labels
-        tables = root.xpath('//ltx:table[@labels]', namespaces=ns)
-        for table in tables:
-            label = table.get('labels')
-            # Get table number from tags
-            tag = table.xpath('.//ltx:tag[@role="refnum"]', namespaces=ns)
+        # Find tables, equations and figures with labels in one pass
+        for elem in _LABELED_XP(root):
+            label = elem.get('labels')
+            # Get the element number from tags
+            tag = _REFNUM_XP(elem)
             if tag:
                 num = tag[0].text
-                label_map[label] = f"Table {num}"
-        
-        # Find equations with labels  
-        equations = root.xpath('//ltx:equation[@labels]', namespaces=ns)
-        for eq in equations:
-            label = eq.get('labels')
-            tag = eq.xpath('.//ltx:tag[@role="refnum"]', namespaces=ns)
-            if tag:
-                num = tag[0].text
-                label_map[label] = f"Equation ({num})"
-        
-        # Find figures with labels
-        figures = root.xpath('//ltx:figure[@labels]', namespaces=ns)
-        for fig in figures:
-            label = fig.get('labels')
-            tag = fig.xpath('.//ltx:tag[@role="refnum"]', namespaces=ns)
-            if tag:
-                num = tag[0].text
-                label_map[label] = f"Figure {num}"
+                label_map[label] = _LABEL_FORMATS[elem.tag].format(num)
         
         # Update all references
-        refs = root.xpath('//ltx:ref', namespaces=ns)
+        refs = _REFS_XP(root)
         print(f"   🔗 Fixing {len(refs)} references...")
         
+        unresolved = []
         for ref in refs:
             labelref = ref.get('labelref')
             if labelref in label_map:
                 ref.text = label_map[labelref]
-                print(f"     ✅ {labelref} → {label_map[labelref]}")
             else:
                 ref.text = f"[{labelref}]"
-                print(f"     ⚠️ Unresolved: {labelref}")
+                unresolved.append(labelref)
+        
+        print(f"     ✅ Resolved {len(refs) - len(unresolved)}/{len(refs)} references")
+        if unresolved:
+            more = "..." if len(unresolved) > 5 else ""
+            print(f"     ⚠️ Unresolved: {', '.join(str(label) for label in unresolved[:5])}{more}")
     
     def _fix_citations_cognitively(self, root):
         """Fix citations using cognitive bibliography processing"""
@@ -670,7 +803,7 @@ Return format: <creators><creator><name>First Last</name><institution>Institutio
         
         # Extract key information from each bibitem
         bib_entries = []
-        for bibitem in biblist.xpath('.//ltx:bibitem', namespaces=ns):
+        for bibitem in _BIBITEMS_XP(biblist):
             xml_id = bibitem.get('xml:id', '')
             key = bibitem.get('key', '')
             
@@ -734,7 +867,7 @@ Requirements:
         
         # Need to map XML IDs to citation keys - extract from original bibliography
         biblist = bibliography.find('.//ltx:biblist', namespaces=ns)
-        for bibitem in biblist.xpath('.//ltx:bibitem', namespaces=ns):
+        for bibitem in _BIBITEMS_XP(biblist):
             xml_id = bibitem.get('xml:id', '')
             # Find matching citation key in bib_data by checking if any key matches this entry
             tags = bibitem.find('.//ltx:tags', namespaces=ns)
@@ -754,11 +887,11 @@ Requirements:
                             break
             
         # Update citations in text
-        citations = root.xpath('//ltx:cite', namespaces=ns)
+        citations = _CITES_XP(root)
         updated_count = 0
         for cite in citations:
             # Look for references to bibliography items
-            refs = cite.xpath('.//ltx:ref', namespaces=ns)
+            refs = _CITE_REFS_XP(cite)
             if refs:
                 new_citations = []
                 for ref in refs:
@@ -894,8 +1027,7 @@ Format: {"key1": {"authors": ["Author Name"], "title": "Title", "year": "2023"}}
                 return json.loads(result)
             else:
                 # Extract JSON from response
-                import re
-                json_match = re.search(r'\{.*\}', result, re.DOTALL)
+                json_match = _JSON_OBJECT_RE.search(result)
                 if json_match:
                     return json.loads(json_match.group())
             
@@ -941,12 +1073,10 @@ Format: {"key1": {"authors": ["Author Name"], "title": "Title", "year": "2023"}}
     def _assess_quality(self) -> float:
         """LaTeXML-adapted quality assessment using StructuralReviewer logic"""
         try:
-            tree = etree.parse(str(self.xml_file))
-            root = tree.getroot()
+            root = self._load_tree().getroot()
             ns = {'ltx': 'http://dlmf.nist.gov/LaTeXML'}
             
             # Collect LaTeX metrics (reuse StructuralReviewer's LaTeX parsing)
-            import re
             latex_content = Path(self.latex_file).read_text(encoding='utf-8')
             
             # LaTeX metrics
@@ -965,7 +1095,7 @@ Format: {"key1": {"authors": ["Author Name"], "title": "Title", "year": "2023"}}
             xml_sections = len(root.xpath('.//ltx:section', namespaces=ns))
             xml_figures = len(root.xpath('.//ltx:figure', namespaces=ns))
             xml_tables = len(root.xpath('.//ltx:table', namespaces=ns))
-            xml_bibitems = len(root.xpath('.//ltx:bibitem', namespaces=ns))
+            xml_bibitems = len(_BIBITEMS_XP(root))
             
             # Calculate component scores using StructuralReviewer's logic
             def safe_ratio(xml_count, latex_count):
@@ -1026,6 +1156,8 @@ Format: {"key1": {"authors": ["Author Name"], "title": "Title", "year": "2023"}}
         
         rating = "EXCELLENT" if quality_score >= 90 else "GOOD" if quality_score >= 80 else "FAIR" if quality_score >= 70 else "POOR"
         print(f"📊 Quality Score: {quality_score:.1f}% ({rating})")
+        if self.bedrock.cache_read_tokens:
+            print(f"💾 Prompt cache: {self.bedrock.cache_read_tokens} input tokens read from cache")
         
         print(f"\n🎉 LaTeXML conversion complete: {self.xml_file}")
 
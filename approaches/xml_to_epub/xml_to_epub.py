@@ -1,256 +1,54 @@
 #!/usr/bin/env python3
 import argparse
+import io
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import re
+import time
 from pathlib import Path
 
-try:
-    import lxml.etree as ET
-    LXML_AVAILABLE = True
-except ImportError:
-    import xml.etree.ElementTree as ET
-    LXML_AVAILABLE = False
-    print("⚠️ lxml not available, falling back to basic ElementTree")
-
-class XmlToEpubConverter:
-    def __init__(self):
-        self.output_dir = Path("epub_books")
-        self.output_dir.mkdir(exist_ok=True)
-        
-        # Load XSLT stylesheet
-        self.xslt_file = Path(__file__).parent / "xml_to_epub.xsl"
-        if not self.xslt_file.exists():
-            raise FileNotFoundError(f"XSLT stylesheet not found: {self.xslt_file}")
-        
-        if LXML_AVAILABLE:
-            self.xslt_doc = ET.parse(str(self.xslt_file))
-            self.transform = ET.XSLT(self.xslt_doc)
-        else:
-            print("⚠️ XSLT transformation not available without lxml")
-    
-    def convert_xml_to_epub(self, xml_file):
-        """Convert XML to ePub format using XSLT transformation"""
-        
-        xml_path = Path(xml_file)
-        if not xml_path.exists():
-            raise FileNotFoundError(f"XML file not found: {xml_file}")
-        
-        print(f"📚 Converting XML to ePub: {xml_file}")
-        
-        # Parse XML document
-        if LXML_AVAILABLE:
-            xml_doc = ET.parse(str(xml_path))
-        else:
-            xml_doc = ET.parse(xml_path)
-        
-        # Extract metadata for ePub files
-        metadata = self._extract_metadata(xml_doc)
-        
-        # Generate ePub filename from title
-        title = metadata['title']
-        safe_title = re.sub(r'[^\w\s-]', '', title).strip()
-        safe_title = re.sub(r'[-\s]+', '_', safe_title)[:50]
-        epub_filename = f"{safe_title}.epub"
-        epub_path = self.output_dir / epub_filename
-        
-        # Transform XML to XHTML using XSLT
-        if LXML_AVAILABLE:
-            content_html = self._transform_with_xslt(xml_doc)
-        else:
-            content_html = self._transform_fallback(xml_doc)
-        
-        # Generate other ePub components
-        content_opf = self._generate_content_opf(metadata, epub_filename)
-        toc_ncx = self._generate_toc_ncx(xml_doc, metadata)
-        styles_css = self._generate_styles_css()
-        
-        # Create ePub
-        with zipfile.ZipFile(epub_path, 'w', zipfile.ZIP_DEFLATED) as epub:
-            epub.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
-            epub.writestr('META-INF/container.xml', self._generate_container_xml())
-            epub.writestr('content.html', content_html)
-            epub.writestr('content.opf', content_opf)
-            epub.writestr('toc.ncx', toc_ncx)
-            epub.writestr('styles.css', styles_css)
-            
-            # Add image files if they exist
-            image_files = ['efficient-models.png']
-            for img_file in image_files:
-                img_path = Path(__file__).parent / img_file
-                if img_path.exists():
-                    epub.write(img_path, img_file)
-        
-        print(f"✅ Generated ePub: {epub_path}")
-        return epub_path
-    
-    def _transform_with_xslt(self, xml_doc):
-        """Transform XML to XHTML using XSLT"""
-        try:
-            result = self.transform(xml_doc)
-            return str(result)
-        except Exception as e:
-            print(f"⚠️ XSLT transformation failed: {e}")
-            print("Falling back to basic transformation...")
-            return self._transform_fallback(xml_doc)
-    
-    def _transform_fallback(self, xml_doc):
-        """Fallback transformation without XSLT"""
-        root = xml_doc.getroot()
-        
-        # Extract basic information
-        ns = {'ap': 'http://example.com/academic-paper'}
-        
-        title_elem = root.find('.//ap:title', ns)
-        title = title_elem.text if title_elem is not None else "Untitled"
-        
-        # Basic HTML structure
-        html = f'''<!DOCTYPE html>
-<html xmlns="http://www.w3.org/1999/xhtml" lang="en">
-<head>
-    <meta charset="utf-8"/>
-    <title>{self._escape_html(title)}</title>
-    <link rel="stylesheet" type="text/css" href="styles.css"/>
-</head>
-<body>
-    <div class="title-page">
-        <h1 class="title">{self._escape_html(title)}</h1>
-        <p><em>Converted without XSLT - install lxml for full transformation</em></p>
-    </div>
-    
-    <div class="content">
-        <p>This ePub was generated using fallback transformation.</p>
-        <p>For full XML-to-XHTML transformation with proper formatting, please install lxml:</p>
-        <p><code>pip install lxml</code></p>
-    </div>
-</body>
-</html>'''
-        return html
-    
-    def _extract_metadata(self, xml_doc):
-        """Extract metadata from XML document"""
-        root = xml_doc.getroot()
-        ns = {'ap': 'http://example.com/academic-paper'}
-        
-        # Extract title
-        title_elem = root.find('.//ap:title', ns)
-        title = title_elem.text if title_elem is not None else "Untitled"
-        
-        # Extract authors
-        authors = []
-        for author_elem in root.findall('.//ap:author', ns):
-            name_elem = author_elem.find('ap:name', ns)
-            if name_elem is not None:
-                authors.append({'name': name_elem.text})
-        
-        # Extract publication info
-        pub_info = {}
-        pub_elem = root.find('.//ap:publication_info', ns)
-        if pub_elem is not None:
-            for field in ['venue', 'date', 'arxiv_id']:
-                elem = pub_elem.find(f'ap:{field}', ns)
-                if elem is not None:
-                    pub_info[field] = elem.text
-        
-        return {
-            'title': title,
-            'authors': authors,
-            'publication_info': pub_info
-        }
-    
-    def _generate_content_opf(self, metadata, filename):
-        """Generate content.opf metadata file"""
-        opf = f'''<?xml version="1.0" encoding="UTF-8"?>
-<package xmlns="http://www.idpf.org/2007/opf" version="2.0" unique-identifier="bookid">
-  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:opf="http://www.idpf.org/2007/opf">
-    <dc:title>{self._escape_xml(metadata['title'])}</dc:title>'''
-        
-        for author in metadata['authors']:
-            opf += f'\n    <dc:creator opf:role="aut">{self._escape_xml(author["name"])}</dc:creator>'
-        
-        if metadata.get('publication_info', {}).get('date'):
-            opf += f'\n    <dc:date>{metadata["publication_info"]["date"]}</dc:date>'
-        
-        if metadata.get('publication_info', {}).get('arxiv_id'):
-            opf += f'\n    <dc:identifier id="bookid">arxiv:{metadata["publication_info"]["arxiv_id"]}</dc:identifier>'
-        else:
-            opf += f'\n    <dc:identifier id="bookid">{filename}</dc:identifier>'
-        
-        opf += '''
-    <dc:language>en</dc:language>
-    <dc:rights>Academic use</dc:rights>
-  </metadata>
-  
-  <manifest>
-    <item id="content" href="content.html" media-type="application/xhtml+xml"/>
-    <item id="toc" href="toc.ncx" media-type="application/x-dtbncx+xml"/>
-    <item id="css" href="styles.css" media-type="text/css"/>
-    <item id="img1" href="efficient-models.png" media-type="image/png"/>
-  </manifest>
-  
-  <spine toc="toc">
-    <itemref idref="content"/>
-  </spine>
-  
-  <guide>
-    <reference type="toc" title="Table of Contents" href="content.html#toc"/>
-  </guide>
-</package>'''
-        return opf
-    
-    def _generate_toc_ncx(self, xml_doc, metadata):
-        """Generate toc.ncx navigation file"""
-        root = xml_doc.getroot()
-        ns = {'ap': 'http://example.com/academic-paper'}
-        
-        ncx = f'''<?xml version="1.0" encoding="UTF-8"?>
-<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
-  <head>
-    <meta name="dtb:uid" content="{metadata.get('publication_info', {}).get('arxiv_id', 'generated')}"/>
-    <meta name="dtb:depth" content="2"/>
-    <meta name="dtb:totalPageCount" content="0"/>
-    <meta name="dtb:maxPageNumber" content="0"/>
-  </head>
-  
-  <docTitle>
-    <text>{self._escape_xml(metadata['title'])}</text>
-  </docTitle>
-  
-  <navMap>'''
-        
-        play_order = 1
-        
-        # Add sections to navigation
-        for section in root.findall('.//ap:section', ns):
-            section_id = section.get('id', f'section{play_order}')
-            title_elem = section.find('ap:title', ns)
-            title = title_elem.text if title_elem is not None else f'Section {play_order}'
-            
-            ncx += f'''
-    <navPoint id="{section_id}" playOrder="{play_order}">
-      <navLabel>
-        <text>{self._escape_xml(title)}</text>
-      </navLabel>
-      <content src="content.html#{section_id}"/>
-    </navPoint>'''
-            play_order += 1
-        
-        ncx += '''
-  </navMap>
-</ncx>'''
-        return ncx
-    
-    def _generate_container_xml(self):
-        """Generate META-INF/container.xml"""
-        return '''<?xml version="1.0" encoding="UTF-8"?>
+from lxml import etree as ET
+
+_NS = {'ap': 'http://example.com/academic-paper'}
+
+# Compiled once at import; each call skips XPath parsing and namespace setup.
+# Paths are relative to the root's <metadata> and <sections> children.
+_XP_TITLE = ET.XPath('ap:title[1]', namespaces=_NS)
+_XP_AUTHOR_NAMES = ET.XPath('ap:authors/ap:author/ap:name', namespaces=_NS)
+_XP_PUB_INFO = ET.XPath('ap:publication_info[1]', namespaces=_NS)
+_XP_ABSTRACT = ET.XPath('ap:abstract[1]', namespaces=_NS)
+_XP_SECTIONS = ET.XPath('.//ap:section', namespaces=_NS)
+_XP_SECTION_TITLE = ET.XPath('ap:title', namespaces=_NS)
+
+# Clark-notation tags of the top-level parts of a paper
+_AP_METADATA = f"{{{_NS['ap']}}}metadata"
+_AP_SECTIONS = f"{{{_NS['ap']}}}sections"
+
+# Clark-notation tag -> publication_info field, for dispatch on child.tag
+_PUB_FIELD_TAGS = {f"{{{_NS['ap']}}}{field}": field for field in ('venue', 'date', 'arxiv_id')}
+
+# Safe-filename sanitization for ePub names derived from the title
+_TITLE_STRIP = re.compile(r'[^\w\s-]')
+_TITLE_COLLAPSE = re.compile(r'[-\s]+')
+
+# Single-pass HTML/XML escaping table for str.translate
+_HTML_ESCAPE = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&#x27;',
+})
+
+# Static ePub entries, pre-encoded once at import
+_MIMETYPE = b'application/epub+zip'
+_CONTAINER_XML = b'''<?xml version="1.0" encoding="UTF-8"?>
 <container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
   <rootfiles>
     <rootfile full-path="content.opf" media-type="application/oebps-package+xml"/>
   </rootfiles>
 </container>'''
-    
-    def _generate_styles_css(self):
-        """Generate CSS styles"""
-        return '''/* Academic ePub Styles with Math Support */
+_STYLES_CSS = b'''/* Academic ePub Styles with Math Support */
 
 body {
     font-family: "Times New Roman", serif;
@@ -417,59 +215,317 @@ body {
 .ref-year {
     font-weight: bold;
 }'''
+
+def _streamed_entry(epub, name):
+    """ZipInfo for streaming an entry into epub, dated now like writestr() dates its entries
+    
+    Opening an entry by bare name would date it 1980-01-01. The archive's compression
+    and level are copied over the same way ZipFile.open() does for a bare name.
+    """
+    info = zipfile.ZipInfo(name, time.localtime()[:6])
+    info.compress_type = epub.compression
+    info._compresslevel = epub.compresslevel
+    return info
+
+class XmlToEpubConverter:
+    def __init__(self):
+        self.output_dir = Path("epub_books")
+        self.output_dir.mkdir(exist_ok=True)
+        
+        # Load XSLT stylesheet
+        self.xslt_file = Path(__file__).parent / "xml_to_epub.xsl"
+        if not self.xslt_file.exists():
+            raise FileNotFoundError(f"XSLT stylesheet not found: {self.xslt_file}")
+        
+        self.xslt_doc = ET.parse(str(self.xslt_file))
+        self.transform = ET.XSLT(self.xslt_doc)
+        
+        # Reused for every document: skip DTD loading, entity resolution and
+        # xml:id bookkeeping the conversion never relies on
+        self._parser = ET.XMLParser(huge_tree=True, collect_ids=False, load_dtd=False,
+                                    resolve_entities=False, no_network=True)
+    
+    def convert_xml_to_epub(self, xml_file):
+        """Convert XML to ePub format using XSLT transformation"""
+        
+        xml_path = Path(xml_file)
+        if not xml_path.exists():
+            raise FileNotFoundError(f"XML file not found: {xml_file}")
+        
+        print(f"📚 Converting XML to ePub: {xml_file}")
+        
+        # Parse XML document
+        xml_doc = ET.parse(str(xml_path), self._parser)
+        
+        # One pass over the root's children finds the top-level parts, so the
+        # lookups below search those subtrees instead of the whole document
+        parts = {}
+        for child in xml_doc.getroot():
+            parts.setdefault(child.tag, child)
+        
+        # Extract metadata and the section outline for ePub files
+        metadata = self._extract_metadata(parts.get(_AP_METADATA))
+        sections = self._extract_sections(parts.get(_AP_SECTIONS))
+        
+        # Generate ePub filename from title
+        title = metadata['title']
+        safe_title = _TITLE_STRIP.sub('', title).strip()
+        safe_title = _TITLE_COLLAPSE.sub('_', safe_title)[:50]
+        epub_filename = f"{safe_title}.epub"
+        epub_path = self.output_dir / epub_filename
+        
+        # Transform XML to XHTML using XSLT
+        content_html = self._transform_with_xslt(xml_doc, metadata)
+        
+        # Generate other ePub components
+        content_opf = self._generate_content_opf(metadata, epub_filename)
+        toc_ncx = self._generate_toc_ncx(sections, metadata)
+        
+        # Create ePub: fast deflate for content.html, the stylesheet and images;
+        # mimetype, container.xml, content.opf and toc.ncx are stored
+        stored = zipfile.ZIP_STORED
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as epub:
+            epub.writestr('mimetype', _MIMETYPE, compress_type=stored)
+            epub.writestr('META-INF/container.xml', _CONTAINER_XML, compress_type=stored)
+            if isinstance(content_html, bytes):
+                epub.writestr('content.html', content_html)
+            else:
+                # Let libxslt serialize straight into the zip entry
+                with epub.open(_streamed_entry(epub, 'content.html'), 'w') as fp:
+                    content_html.write_output(fp)
+            epub.writestr('content.opf', content_opf, compress_type=stored)
+            epub.writestr('toc.ncx', toc_ncx, compress_type=stored)
+            epub.writestr('styles.css', _STYLES_CSS)
+            
+            # Add image files if they exist
+            image_files = ['efficient-models.png']
+            for img_file in image_files:
+                img_path = Path(__file__).parent / img_file
+                if img_path.exists():
+                    epub.write(img_path, img_file)
+        
+        # Assembled in memory, written to disk with a single call
+        epub_path.write_bytes(buffer.getbuffer())
+        
+        print(f"✅ Generated ePub: {epub_path}")
+        return epub_path
+    
+    def _transform_with_xslt(self, xml_doc, metadata):
+        """Transform XML to XHTML using XSLT, returning the result tree"""
+        try:
+            return self.transform(xml_doc)
+        except Exception as e:
+            print(f"⚠️ XSLT transformation failed: {e}")
+            print("Falling back to basic transformation...")
+            return self._transform_fallback(metadata)
+    
+    def _transform_fallback(self, metadata):
+        """Fallback transformation used when the XSLT transform fails, as UTF-8 bytes"""
+        # Reuse the metadata already extracted by convert_xml_to_epub
+        title = metadata['title']
+        
+        # Basic HTML structure
+        html = f'''<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" lang="en">
+<head>
+    <meta charset="utf-8"/>
+    <title>{self._escape_html(title)}</title>
+    <link rel="stylesheet" type="text/css" href="styles.css"/>
+</head>
+<body>
+    <div class="title-page">
+        <h1 class="title">{self._escape_html(title)}</h1>
+        <p><em>Converted without XSLT - the stylesheet transformation failed</em></p>
+    </div>
+    
+    <div class="content">
+        <p>This ePub was generated using fallback transformation because the XSLT stylesheet could not be applied.</p>
+    </div>
+</body>
+</html>'''
+        # Encoded here so writestr stores it without another conversion
+        return html.encode('utf-8')
+    
+    def _extract_metadata(self, metadata_elem):
+        """Extract metadata from the document's <metadata> element"""
+        if metadata_elem is None:
+            return {'title': "Untitled", 'authors': [], 'abstract_text': '', 'publication_info': {}}
+        
+        # Extract title
+        title_elems = _XP_TITLE(metadata_elem)
+        title = title_elems[0].text if title_elems else "Untitled"
+        
+        # Extract authors
+        authors = [{'name': name_elem.text} for name_elem in _XP_AUTHOR_NAMES(metadata_elem) if name_elem.text]
+        
+        # Plain-text abstract for the OPF description (the XSLT renders the rich version)
+        abstract_elems = _XP_ABSTRACT(metadata_elem)
+        abstract_text = ' '.join(''.join(abstract_elems[0].itertext()).split())[:500] if abstract_elems else ''
+        
+        # Extract publication info
+        pub_info = {}
+        pub_elems = _XP_PUB_INFO(metadata_elem)
+        if pub_elems:
+            # One pass over the children instead of a lookup per field
+            for child in pub_elems[0]:
+                field = _PUB_FIELD_TAGS.get(child.tag)
+                if field is not None:
+                    pub_info.setdefault(field, child.text)
+        
+        return {
+            'title': title,
+            'authors': authors,
+            'abstract_text': abstract_text,
+            'publication_info': pub_info
+        }
+    
+    def _extract_sections(self, sections_elem):
+        """Collect (id, title) for each section in document order"""
+        sections = []
+        if sections_elem is None:
+            return sections
+        for number, section in enumerate(_XP_SECTIONS(sections_elem), start=1):
+            title_elems = _XP_SECTION_TITLE(section)
+            sections.append((
+                section.get('id', f'section{number}'),
+                title_elems[0].text if title_elems else f'Section {number}',
+            ))
+        return sections
+    
+    def _generate_content_opf(self, metadata, filename):
+        """Generate content.opf metadata file"""
+        parts = [f'''<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="2.0" unique-identifier="bookid">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:opf="http://www.idpf.org/2007/opf">
+    <dc:title>{self._escape_xml(metadata['title'])}</dc:title>''']
+        
+        for author in metadata['authors']:
+            parts.append(f'\n    <dc:creator opf:role="aut">{self._escape_xml(author["name"])}</dc:creator>')
+        
+        if metadata.get('abstract_text'):
+            parts.append(f'\n    <dc:description>{self._escape_xml(metadata["abstract_text"])}</dc:description>')
+        
+        if metadata.get('publication_info', {}).get('date'):
+            parts.append(f'\n    <dc:date>{metadata["publication_info"]["date"]}</dc:date>')
+        
+        if metadata.get('publication_info', {}).get('arxiv_id'):
+            parts.append(f'\n    <dc:identifier id="bookid">arxiv:{metadata["publication_info"]["arxiv_id"]}</dc:identifier>')
+        else:
+            parts.append(f'\n    <dc:identifier id="bookid">{filename}</dc:identifier>')
+        
+        parts.append('''
+    <dc:language>en</dc:language>
+    <dc:rights>Academic use</dc:rights>
+  </metadata>
+  
+  <manifest>
+    <item id="content" href="content.html" media-type="application/xhtml+xml"/>
+    <item id="toc" href="toc.ncx" media-type="application/x-dtbncx+xml"/>
+    <item id="css" href="styles.css" media-type="text/css"/>
+    <item id="img1" href="efficient-models.png" media-type="image/png"/>
+  </manifest>
+  
+  <spine toc="toc">
+    <itemref idref="content"/>
+  </spine>
+  
+  <guide>
+    <reference type="toc" title="Table of Contents" href="content.html#toc"/>
+  </guide>
+</package>''')
+        return ''.join(parts)
+    
+    def _generate_toc_ncx(self, sections, metadata):
+        """Generate toc.ncx navigation file"""
+        parts = [f'''<?xml version="1.0" encoding="UTF-8"?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
+  <head>
+    <meta name="dtb:uid" content="{metadata.get('publication_info', {}).get('arxiv_id', 'generated')}"/>
+    <meta name="dtb:depth" content="2"/>
+    <meta name="dtb:totalPageCount" content="0"/>
+    <meta name="dtb:maxPageNumber" content="0"/>
+  </head>
+  
+  <docTitle>
+    <text>{self._escape_xml(metadata['title'])}</text>
+  </docTitle>
+  
+  <navMap>''']
+        
+        # Add sections to navigation
+        for play_order, (section_id, title) in enumerate(sections, start=1):
+            parts.append(f'''
+    <navPoint id="{section_id}" playOrder="{play_order}">
+      <navLabel>
+        <text>{self._escape_xml(title)}</text>
+      </navLabel>
+      <content src="content.html#{section_id}"/>
+    </navPoint>''')
+        
+        parts.append('''
+  </navMap>
+</ncx>''')
+        return ''.join(parts)
     
     def _escape_html(self, text):
         """Escape HTML special characters"""
-        if not text:
-            return ''
-        return (text.replace('&', '&amp;')
-                   .replace('<', '&lt;')
-                   .replace('>', '&gt;')
-                   .replace('"', '&quot;')
-                   .replace("'", '&#x27;'))
+        return text.translate(_HTML_ESCAPE) if text else ''
     
     def _escape_xml(self, text):
         """Escape XML special characters"""
         return self._escape_html(text)
 
+def _convert_one(xml_file):
+    """Convert one XML file with a converter owned by this worker process"""
+    converter = XmlToEpubConverter()
+    epub_path = converter.convert_xml_to_epub(xml_file)
+    print(f"📊 Generated ePub: {epub_path.stat().st_size:,} bytes")
+    return epub_path
+
 def main():
     """XML to ePub conversion with XSLT"""
-    parser = argparse.ArgumentParser(description='Convert XML file to ePub format')
-    parser.add_argument('xml_file', help='Path to the XML file to convert')
+    parser = argparse.ArgumentParser(description='Convert XML files to ePub format')
+    parser.add_argument('xml_files', nargs='+', help='Path(s) to the XML file(s) to convert')
     
     args = parser.parse_args()
     
-    xml_file = args.xml_file
-    
-    if not Path(xml_file).exists():
-        print(f"❌ XML file not found: {xml_file}")
+    xml_files = []
+    for xml_file in args.xml_files:
+        if Path(xml_file).exists():
+            xml_files.append(xml_file)
+        else:
+            print(f"❌ XML file not found: {xml_file}")
+    if not xml_files:
         return
     
-    converter = XmlToEpubConverter()
-    
     print("🚀 XML-to-ePub Converter (XSLT)")
     print("=" * 50)
-    if LXML_AVAILABLE:
-        print("✨ Features: XSLT transformation, native MathML support, professional XHTML")
-    else:
-        print("⚠️ Limited features: lxml not available, using fallback transformation")
+    print("✨ Features: XSLT transformation, native MathML support, professional XHTML")
     print()
     
-    try:
-        epub_path = converter.convert_xml_to_epub(xml_file)
-        
-        file_size = epub_path.stat().st_size
-        print(f"📊 Generated ePub: {file_size:,} bytes")
-        
-        if LXML_AVAILABLE:
+    if len(xml_files) == 1:
+        try:
+            _convert_one(xml_files[0])
             print("🎉 XSLT transformation complete!")
-        else:
-            print("⚠️ Fallback transformation complete - install lxml for full features")
-        
-    except Exception as e:
-        print(f"❌ Error converting XML to ePub: {e}")
-        import traceback
-        traceback.print_exc()
+        except Exception as e:
+            print(f"❌ Error converting XML to ePub: {e}")
+            import traceback
+            traceback.print_exc()
+        return
+    
+    # Independent CPU-bound conversions: one per worker process
+    converted = 0
+    with ProcessPoolExecutor() as executor:
+        futures = {executor.submit(_convert_one, xml_file): xml_file for xml_file in xml_files}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                converted += 1
+            except Exception as e:
+                print(f"❌ Error converting {futures[future]} to ePub: {e}")
+    
+    print(f"🎉 XSLT transformation complete: {converted}/{len(xml_files)} files")
 
 if __name__ == "__main__":
     main()
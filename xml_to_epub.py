@@ -4,10 +4,57 @@ LaTeXML XML to ePub Converter
 Transforms LaTeXML XML to ePub using XSLT
 """
 
+import io
+import os
 import sys
+import shutil
+import time
+import mimetypes
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 from lxml import etree
+from lxml.builder import ElementMaker
+
+_NS = {'ltx': 'http://dlmf.nist.gov/LaTeXML'}
+_XP_GRAPHICS_ATTR = etree.XPath('.//ltx:graphics/@graphic', namespaces=_NS)
+
+# Element builders for the package documents; lxml escapes text and attributes
+_OPF_NS = 'http://www.idpf.org/2007/opf'
+_DC_NS = 'http://purl.org/dc/elements/1.1/'
+_NCX_NS = 'http://www.daisy.org/z3986/2005/ncx/'
+_OPF = ElementMaker(namespace=_OPF_NS, nsmap={None: _OPF_NS, 'dc': _DC_NS})
+_DC = ElementMaker(namespace=_DC_NS, nsmap={'dc': _DC_NS})
+_NCX = ElementMaker(namespace=_NCX_NS, nsmap={None: _NCX_NS})
+
+# Static ePub entries, pre-encoded once at import
+_MIMETYPE = b'application/epub+zip'
+_CONTAINER_XML = b'''<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>'''
+
+# ePubs whose inputs fit under this size are assembled in memory and written once
+_IN_MEMORY_EPUB_LIMIT = 64 * 1024 * 1024
+
+@lru_cache(maxsize=None)
+def _load_transform(xslt_path: str) -> etree.XSLT:
+    """Compile a stylesheet once per process so batch runs reuse it"""
+    return etree.XSLT(etree.parse(xslt_path))
+
+def _streamed_entry(epub, name):
+    """ZipInfo for streaming an entry into epub, dated now like writestr() dates its entries
+    
+    Opening an entry by bare name would date it 1980-01-01. The archive's compression
+    and level are copied over the same way ZipFile.open() does for a bare name.
+    """
+    info = zipfile.ZipInfo(name, time.localtime()[:6])
+    info.compress_type = epub.compression
+    info._compresslevel = epub.compresslevel
+    return info
 
 class LaTeXMLToEpubConverter:
     """Convert LaTeXML XML to ePub format"""
@@ -22,6 +69,9 @@ class LaTeXMLToEpubConverter:
         self.epub_file = self.output_dir / f"{base_name}.epub"
         
         self.xslt_file = Path(__file__).parent / "xml_to_epub.xsl"
+        
+        self._xml_tree = None
+        self._xpath = None
     
     def convert_to_epub(self) -> str:
         """Convert LaTeXML XML to ePub"""
@@ -32,13 +82,13 @@ class LaTeXMLToEpubConverter:
         print(f"\n📚 Converting XML to ePub: {self.xml_file}")
         
         # Transform XML to XHTML using XSLT
-        html_content = self._transform_xml_to_html()
+        html_result = self._transform_xml_to_html()
         
-        if not html_content:
+        if html_result is None:
             raise RuntimeError("XSLT transformation failed")
         
         # Create ePub package
-        self._create_epub_package(html_content)
+        self._create_epub_package(html_result)
         
         # Results
         file_size = self.epub_file.stat().st_size
@@ -48,18 +98,19 @@ class LaTeXMLToEpubConverter:
         
         return str(self.epub_file)
     
-    def _transform_xml_to_html(self) -> str:
-        """Transform LaTeXML XML to XHTML using XSLT"""
+    def _transform_xml_to_html(self):
+        """Transform LaTeXML XML to XHTML using XSLT, returning the result tree"""
         try:
-            # Load XML
+            # Load XML once; the document-bound evaluator is reused for every query
             xml_doc = etree.parse(str(self.xml_file))
+            self._xml_tree = xml_doc
+            self._xpath = etree.XPathEvaluator(xml_doc, namespaces=_NS)
             
             # Load XSLT
             if not self.xslt_file.exists():
                 raise FileNotFoundError(f"XSLT file not found: {self.xslt_file}")
             
-            xslt_doc = etree.parse(str(self.xslt_file))
-            transform = etree.XSLT(xslt_doc)
+            transform = _load_transform(str(self.xslt_file))
             
             # Apply transformation
             result = transform(xml_doc)
@@ -68,33 +119,27 @@ class LaTeXMLToEpubConverter:
                 print("❌ XSLT transformation returned None")
                 return None
             
-            # Convert to string
-            html_content = etree.tostring(result, encoding='unicode', method='xml')
-            
-            print(f"✅ XSLT transformation successful ({len(html_content)} chars)")
-            return html_content
+            # Serialization is deferred to packaging so the XHTML is written
+            # straight into the zip entry without an intermediate string
+            print("✅ XSLT transformation successful")
+            return result
             
         except Exception as e:
             print(f"❌ XSLT transformation failed: {e}")
             return None
     
-    def _create_epub_package(self, html_content: str):
+    def _create_epub_package(self, html_result):
         """Create ePub package with the transformed HTML"""
         
-        # Extract title and authors from XML
-        tree = etree.parse(str(self.xml_file))
-        root = tree.getroot()
-        ns = {'ltx': 'http://dlmf.nist.gov/LaTeXML'}
-        
-        # Extract title
-        title_elem = root.find('.//ltx:title', namespaces=ns)
-        title = title_elem.text if title_elem is not None else "Academic Paper"
+        # Extract title (reusing the tree parsed during transformation)
+        title_elems = self._xpath('(//ltx:title)[1]')
+        title = title_elems[0].text if title_elems else "Academic Paper"
         
         # Extract authors
-        creators = root.xpath('//ltx:creator[@role="author"]', namespaces=ns)
+        creators = self._xpath('//ltx:creator[@role="author"]')
         authors = []
         for creator in creators:
-            personname = creator.find('.//ltx:personname', namespaces=ns)
+            personname = creator.find('.//ltx:personname', namespaces=_NS)
             if personname is not None and personname.text:
                 # Extract just the name (first line before any break)
                 name = personname.text.strip()
@@ -103,94 +148,120 @@ class LaTeXMLToEpubConverter:
         author_string = ", ".join(authors) if authors else "Academic Paper"
         
         # Find image files referenced in the XML
-        image_files = self._find_image_files(root, ns)
+        image_files = self._find_image_files(self._xml_tree.getroot())
         
-        # Create ePub structure
-        with zipfile.ZipFile(self.epub_file, 'w', zipfile.ZIP_DEFLATED) as epub:
+        # One directory scan instead of a stat() per referenced image
+        available = self._list_output_images()
+        
+        # Typical papers are built in a BytesIO and flushed with a single write;
+        # very large ones (big figures) are written to the output file directly
+        input_size = self.xml_file.stat().st_size + sum(
+            available[img_file].stat().st_size for img_file in image_files if img_file in available
+        )
+        target = io.BytesIO() if input_size <= _IN_MEMORY_EPUB_LIMIT else self.epub_file
+        
+        # Create ePub structure (written once, read many times: favour ratio
+        # for the text entries; mimetype and images are stored)
+        with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as epub:
             
             # mimetype (must be first, uncompressed)
-            epub.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+            epub.writestr('mimetype', _MIMETYPE, compress_type=zipfile.ZIP_STORED)
             
             # META-INF/container.xml
-            container_xml = '''<?xml version="1.0" encoding="UTF-8"?>
-<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
-  <rootfiles>
-    <rootfile full-path="content.opf" media-type="application/oebps-package+xml"/>
-  </rootfiles>
-</container>'''
-            epub.writestr('META-INF/container.xml', container_xml)
+            epub.writestr('META-INF/container.xml', _CONTAINER_XML)
             
             # content.opf (package document)
-            image_manifest = ""
-            for img_file in image_files:
-                img_id = Path(img_file).stem
-                image_manifest += f'    <item id="{img_id}" href="{img_file}" media-type="image/png"/>\n'
-            
-            content_opf = f'''<?xml version="1.0" encoding="UTF-8"?>
-<package xmlns="http://www.idpf.org/2007/opf" version="2.0" unique-identifier="bookid">
-  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:opf="http://www.idpf.org/2007/opf">
-    <dc:title>{title}</dc:title>
-    <dc:creator>{author_string}</dc:creator>
-    <dc:identifier id="bookid">urn:uuid:academic-paper-{self.xml_file.stem}</dc:identifier>
-    <dc:language>en</dc:language>
-    <meta name="cover" content="cover"/>
-  </metadata>
-  <manifest>
-    <item id="content" href="content.html" media-type="application/xhtml+xml"/>
-    <item id="toc" href="toc.ncx" media-type="application/x-dtbncx+xml"/>
-{image_manifest}  </manifest>
-  <spine toc="toc">
-    <itemref idref="content"/>
-  </spine>
-</package>'''
-            epub.writestr('content.opf', content_opf)
+            epub.writestr('content.opf', self._build_content_opf(title, author_string, image_files))
             
             # toc.ncx (navigation)
-            toc_ncx = f'''<?xml version="1.0" encoding="UTF-8"?>
-<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
-  <head>
-    <meta name="dtb:uid" content="urn:uuid:academic-paper-{self.xml_file.stem}"/>
-    <meta name="dtb:depth" content="1"/>
-    <meta name="dtb:totalPageCount" content="0"/>
-    <meta name="dtb:maxPageNumber" content="0"/>
-  </head>
-  <docTitle>
-    <text>{title}</text>
-  </docTitle>
-  <navMap>
-    <navPoint id="content" playOrder="1">
-      <navLabel>
-        <text>{title}</text>
-      </navLabel>
-      <content src="content.html"/>
-    </navPoint>
-  </navMap>
-</ncx>'''
-            epub.writestr('toc.ncx', toc_ncx)
+            epub.writestr('toc.ncx', self._build_toc_ncx(title))
             
-            # content.html (main content)
-            epub.writestr('content.html', html_content)
+            # content.html (main content), serialized by libxml2 as UTF-8
+            # directly into the deflate stream
+            with epub.open(_streamed_entry(epub, 'content.html'), 'w') as fh:
+                html_result.write(fh, encoding='utf-8', method='xml', xml_declaration=False)
+            print(f"   📄 Wrote content.html ({epub.getinfo('content.html').file_size:,} bytes UTF-8)")
             
-            # Add image files to ePub
+            # Add image files to ePub (PNG is already deflated, so store as-is)
             for img_file in image_files:
-                img_path = Path("output") / img_file
-                if img_path.exists():
-                    with open(img_path, 'rb') as f:
-                        epub.writestr(img_file, f.read())
+                if img_file in available:
+                    img_path = available[img_file].path
+                    img_info = zipfile.ZipInfo.from_file(img_path, arcname=img_file)
+                    img_info.compress_type = zipfile.ZIP_STORED
+                    # Copy in fixed-size chunks rather than reading the whole image
+                    with open(img_path, 'rb') as src, epub.open(img_info, 'w') as dst:
+                        shutil.copyfileobj(src, dst, length=1 << 20)
                     print(f"   📷 Added image: {img_file}")
-    
-    def _find_image_files(self, root, ns):
-        """Find all image files referenced in the XML"""
-        image_files = []
-        graphics = root.xpath('.//ltx:graphics', namespaces=ns)
         
-        for graphic in graphics:
-            graphic_name = graphic.get('graphic')
-            if graphic_name:
-                png_file = f"{graphic_name}.png"
-                image_files.append(png_file)
+        if isinstance(target, io.BytesIO):
+            self.epub_file.write_bytes(target.getbuffer())
+    
+    def _build_content_opf(self, title: str, author_string: str, image_files) -> bytes:
+        """Build the OPF package document"""
+        manifest = _OPF.manifest(
+            _OPF.item(id="content", href="content.html", **{'media-type': "application/xhtml+xml"}),
+            _OPF.item(id="toc", href="toc.ncx", **{'media-type': "application/x-dtbncx+xml"}),
+        )
+        for img_file in image_files:
+            img_type = mimetypes.guess_type(img_file)[0] or 'application/octet-stream'
+            manifest.append(_OPF.item(id=Path(img_file).stem, href=img_file, **{'media-type': img_type}))
         
-        return image_files
+        package = _OPF.package(
+            _OPF.metadata(
+                _DC.title(title),
+                _DC.creator(author_string),
+                _DC.identifier(f"urn:uuid:academic-paper-{self.xml_file.stem}", id="bookid"),
+                _DC.language("en"),
+                _OPF.meta(name="cover", content="cover"),
+            ),
+            manifest,
+            _OPF.spine(_OPF.itemref(idref="content"), toc="toc"),
+            version="2.0",
+            **{'unique-identifier': "bookid"},
+        )
+        etree.cleanup_namespaces(package)
+        return etree.tostring(package, xml_declaration=True, encoding='UTF-8', pretty_print=True)
+    
+    def _build_toc_ncx(self, title: str) -> bytes:
+        """Build the NCX navigation document"""
+        uid = f"urn:uuid:academic-paper-{self.xml_file.stem}"
+        ncx = _NCX.ncx(
+            _NCX.head(
+                _NCX.meta(name="dtb:uid", content=uid),
+                _NCX.meta(name="dtb:depth", content="1"),
+                _NCX.meta(name="dtb:totalPageCount", content="0"),
+                _NCX.meta(name="dtb:maxPageNumber", content="0"),
+            ),
+            _NCX.docTitle(_NCX.text(title)),
+            _NCX.navMap(
+                _NCX.navPoint(
+                    _NCX.navLabel(_NCX.text(title)),
+                    _NCX.content(src="content.html"),
+                    id="content",
+                    playOrder="1",
+                ),
+            ),
+            version="2005-1",
+        )
+        return etree.tostring(ncx, xml_declaration=True, encoding='UTF-8', pretty_print=True)
+    
+    def _list_output_images(self) -> dict:
+        """Map file names in output/ to their directory entries"""
+        try:
+            with os.scandir("output") as entries:
+                return {entry.name: entry for entry in entries if entry.is_file()}
+        except FileNotFoundError:
+            return {}
+    
+    def _find_image_files(self, root):
+        """Find all image files referenced in the XML"""
+        # Select the attribute values directly instead of calling .get() per element;
+        # a dict keeps first-seen order while dropping figures referenced twice
+        seen = {}
+        for name in _XP_GRAPHICS_ATTR(root):
+            if name:
+                seen.setdefault(f"{name}.png", None)
+        return list(seen)
     
     def _extract_title_from_html(self, html_content: str) -> str:
         """Extract title from HTML content"""
@@ -207,24 +278,46 @@ class LaTeXMLToEpubConverter:
         except Exception:
             return "Academic Paper"
 
-def main():
+def _convert_one(xml_file: str, converter_cls=LaTeXMLToEpubConverter) -> str:
+    """Convert a single XML file (top-level so it can run in a worker process)"""
+    return converter_cls(xml_file).convert_to_epub()
+
+def main(converter_cls=LaTeXMLToEpubConverter):
     """Command-line interface"""
-    if len(sys.argv) != 2:
-        print("Usage: python3 xml_to_epub.py <xml_file>")
+    if len(sys.argv) < 2:
+        print(f"Usage: python3 {Path(sys.argv[0]).name} <xml_file> [<xml_file> ...]")
         sys.exit(1)
     
-    xml_file = sys.argv[1]
+    xml_files = sys.argv[1:]
     
-    if not Path(xml_file).exists():
-        print(f"Error: XML file '{xml_file}' not found")
-        sys.exit(1)
+    for xml_file in xml_files:
+        if not Path(xml_file).exists():
+            print(f"Error: XML file '{xml_file}' not found")
+            sys.exit(1)
+    
+    if len(xml_files) == 1:
+        try:
+            epub_file = _convert_one(xml_files[0], converter_cls)
+            print(f"\n✅ Success! ePub output: {epub_file}")
+        except Exception as e:
+            print(f"\n❌ Conversion failed: {e}")
+            sys.exit(1)
+        return
+    
+    # Parse, XSLT and DEFLATE are CPU-bound, so batches fan out across processes
+    failed = 0
+    with ProcessPoolExecutor() as executor:
+        futures = {executor.submit(_convert_one, xml_file, converter_cls): xml_file
+                   for xml_file in xml_files}
+        for future in as_completed(futures):
+            try:
+                print(f"\n✅ Success! ePub output: {future.result()}")
+            except Exception as e:
+                print(f"\n❌ Conversion failed for {futures[future]}: {e}")
+                failed += 1
     
-    try:
-        converter = LaTeXMLToEpubConverter(xml_file)
-        epub_file = converter.convert_to_epub()
-        print(f"\n✅ Success! ePub output: {epub_file}")
-    except Exception as e:
-        print(f"\n❌ Conversion failed: {e}")
+    print(f"\n📊 Converted {len(xml_files) - failed}/{len(xml_files)} files")
+    if failed:
         sys.exit(1)
 
 if __name__ == "__main__":
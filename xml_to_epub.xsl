@@ -10,14 +10,19 @@
               doctype-public="-//W3C//DTD XHTML 1.1//EN"
               doctype-system="http://www.w3.org/TR/xhtml11/DTD/xhtml11.dtd"/>
 
+  <!-- Indexes built once per document instead of rescanning with // -->
+  <xsl:key name="creators-by-role" match="ltx:creator" use="@role"/>
+  <xsl:key name="notes-by-role" match="ltx:note" use="@role"/>
+  <xsl:variable name="document-title" select="(//ltx:title)[1]"/>
+
   <!-- Root template -->
   <xsl:template match="/">
     <html xmlns="http://www.w3.org/1999/xhtml">
       <head>
         <title>
           <xsl:choose>
-            <xsl:when test="//ltx:title[1]">
-              <xsl:value-of select="//ltx:title[1]"/>
+            <xsl:when test="$document-title">
+              <xsl:value-of select="$document-title"/>
             </xsl:when>
             <xsl:otherwise>Academic Paper</xsl:otherwise>
           </xsl:choose>
@@ -241,10 +246,10 @@
       <body>
         <!-- Document title and authors -->
         <div class="document-header">
-          <h1 class="document-title"><xsl:value-of select="//ltx:title[1]"/></h1>
-          <xsl:if test="//ltx:creator[@role='author']">
+          <h1 class="document-title"><xsl:value-of select="$document-title"/></h1>
+          <xsl:if test="key('creators-by-role', 'author')">
             <div class="document-authors">
-              <xsl:for-each select="//ltx:creator[@role='author']">
+              <xsl:for-each select="key('creators-by-role', 'author')">
                 <div class="author">
                   <xsl:apply-templates select="ltx:personname"/>
                 </div>
@@ -521,11 +526,11 @@
   
   <!-- Notes section (collect all footnotes) -->
   <xsl:template name="notes-section">
-    <xsl:if test="//ltx:note[@role='footnote']">
+    <xsl:if test="key('notes-by-role', 'footnote')">
       <div class="notes-section">
         <h2 class="section-title">Notes</h2>
         <div class="notes-list">
-          <xsl:for-each select="//ltx:note[@role='footnote']">
+          <xsl:for-each select="key('notes-by-role', 'footnote')">
             <div class="note-item" id="{@xml:id}">
               <span class="note-number"><xsl:value-of select="@mark"/>. </span>
               <span class="note-content">